@@ -5,7 +5,7 @@
 # ============================================
 # VERSION INFO
 # ============================================
-BOT_VERSION = "1.6.6"
+BOT_VERSION = "1.7.7"
 BOT_BUILD_DATE = "2026-01-05"
 # ============================================
 
@@ -174,6 +174,10 @@ async def on_ready():
     
     # Setup module configuration
     setup_module_config()
+
+    # Start the coalescing state saver
+    import state_manager
+    state_manager.start_save_worker()
     
     # Setup commands FIRST
     try:
@@ -265,9 +269,9 @@ async def on_ready():
         traceback.print_exc()
     
     # Register persistent views for buttons to work after restart
-    from searchmatchmaking import QueueView, PingJoinView
+    from searchmatchmaking import get_queue_view, PingJoinView
     from ingame import SeriesView
-    bot.add_view(QueueView())
+    bot.add_view(get_queue_view())
     bot.add_view(PingJoinView())
 
     # Register playlist views for all playlist types
@@ -296,7 +300,7 @@ async def on_ready():
                 if channel:
                     from searchmatchmaking import update_queue_embed, queue_state, queue_state_2
                     await update_queue_embed(channel)
-                    print(f'✅ Restored main queue: {len(queue_state.queue)} players')
+                    print(f'✅ Restored main queue: {len(queue_state.entries)} players')
 
                     # If series was active, recreate the series embed and register the view
                     if queue_state.current_series:
@@ -311,7 +315,7 @@ async def on_ready():
                 if channel2:
                     from searchmatchmaking import update_queue_embed, queue_state_2
                     await update_queue_embed(channel2, queue_state_2)
-                    print(f'✅ Restored queue 2: {len(queue_state_2.queue)} players')
+                    print(f'✅ Restored queue 2: {len(queue_state_2.entries)} players')
 
                     # If series was active on queue 2, recreate the series embed and register the view
                     if queue_state_2.current_series:
@@ -356,6 +360,39 @@ async def on_command_error(ctx, error):
     log_action(f"Command error: {error}")
     await ctx.send(f"❌ Error: {error}")
 
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    """Drop cached role IDs when a role is renamed"""
+    if before.name != after.name:
+        from searchmatchmaking import invalidate_role_cache
+        invalidate_role_cache(after.guild.id)
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    """Drop cached role IDs when a role is created (it may be a banned/required role)"""
+    from searchmatchmaking import invalidate_role_cache
+    invalidate_role_cache(role.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    """Drop cached role IDs when a role is deleted"""
+    from searchmatchmaking import invalidate_role_cache
+    invalidate_role_cache(role.guild.id)
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    """Drop a cached display name when a member's nickname changes"""
+    if before.display_name != after.display_name:
+        from searchmatchmaking import invalidate_display_name
+        invalidate_display_name(after.id)
+
+@bot.event
+async def on_user_update(before: discord.User, after: discord.User):
+    """Drop a cached display name when a user's global name changes"""
+    if before.display_name != after.display_name:
+        from searchmatchmaking import invalidate_display_name
+        invalidate_display_name(after.id)
+
 @bot.event
 async def on_interaction(interaction: discord.Interaction):
     """Handle interactions, including inactivity confirmation buttons after restart"""
@@ -385,8 +422,9 @@ async def on_interaction(interaction: discord.Interaction):
 
         if custom_id.startswith("inactivity_yes_"):
             # User wants to stay in queue
-            if user_id in queue_state.queue:
-                queue_state.queue_join_times[user_id] = datetime.now()
+            entry = queue_state.entries.get(user_id)
+            if entry:
+                entry.last_activity = datetime.now()
                 log_action(f"User {interaction.user.display_name} confirmed to stay in queue - timer reset")
 
                 await cleanup_inactivity_messages(user_id)
@@ -407,7 +445,7 @@ async def on_interaction(interaction: discord.Interaction):
 
         elif custom_id.startswith("inactivity_no_"):
             # User wants to leave queue
-            if user_id in queue_state.queue:
+            if user_id in queue_state.entries:
                 # Get guild - use interaction.guild if available, otherwise get from queue_channel (for DM buttons)
                 guild = interaction.guild or (queue_state.queue_channel.guild if queue_state.queue_channel else None)
                 if guild:
@@ -446,7 +484,7 @@ async def on_message(message: discord.Message):
             try:
                 import STATSRANKS
                 # Get all players from ranks.json (website source of truth)
-                ranks = STATSRANKS.load_json_file(STATSRANKS.RANKS_FILE)
+                ranks = STATSRANKS.load_json_file_cached(STATSRANKS.RANKS_FILE)
                 player_ids = [int(uid) for uid in ranks.keys() if uid.isdigit()]
 
                 # Refresh all ranks (Discord roles)
@@ -461,15 +499,16 @@ async def on_message(message: discord.Message):
                         series = queue_state.current_series
                         print(f"[RANKS] Updating active series embed with new ranks...")
 
-                        # Update series channel embed
+                        # Update series channel embed (this also refreshes the general chat embed)
+                        series_channel = None
                         if series.text_channel_id:
                             series_channel = message.guild.get_channel(series.text_channel_id)
-                            if series_channel and series.series_message:
-                                view = ingame.SeriesView(series)
-                                await view.update_series_embed(series_channel)
-
-                        # Update general chat embed
-                        await ingame.update_general_chat_embed(message.guild, series)
+                        if series_channel and series.series_message:
+                            view = ingame.SeriesView(series)
+                            await view.update_series_embed(series_channel)
+                        else:
+                            # Update general chat embed
+                            await ingame.update_general_chat_embed(message.guild, series)
                         print(f"[RANKS] Active series embeds updated")
                 except Exception as embed_error:
                     print(f"[RANKS] Could not update series embeds: {embed_error}")
@@ -537,8 +576,8 @@ async def on_message(message: discord.Message):
 
                     # Save state
                     try:
-                        from state_manager import save_state
-                        save_state()
+                        from state_manager import request_save
+                        request_save()
                     except:
                         pass
 
@@ -791,3 +830,11 @@ if not TOKEN:
 else:
     print("🚀 Starting bot...")
     bot.run(TOKEN)
+
+    # Flush any state change still waiting on the background saver
+    import state_manager
+    state_manager.flush_pending_save()
+
+    # Upload any GitHub push still waiting on the background pusher
+    import github_webhook
+    github_webhook.flush_pending_pushes()
@@ -8,17 +8,19 @@ Import this module in bot.py with:
 Commands are defined in commands.py and call functions from this module.
 """
 
-MODULE_VERSION = "1.5.0"
+MODULE_VERSION = "1.5.6"
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
 import os
+import re
 import asyncio
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import math
+import json_io
+
 
 # Import GitHub functions for pulling ranks.json and emblems.json
 try:
@@ -108,11 +110,35 @@ def get_emblem_png_url(emblem_url: str) -> str:
 def load_json_file(filepath: str) -> dict:
     """Load JSON file, create if doesn't exist"""
     if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
+        return json_io.load_file(filepath)
     return {}
 
 
+# Parsed read-only JSON files, reused while the file is unchanged on disk
+# {filepath: (mtime_ns, data)}
+_json_cache = {}
+
+
+def load_json_file_cached(filepath: str) -> dict:
+    """Load a JSON file, reusing the parsed copy if the file hasn't changed since.
+
+    The returned dict is shared between callers - read it, don't modify it.
+    Use load_json_file() to get a private copy for read-modify-write.
+    """
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except OSError:
+        return {}
+
+    cached = _json_cache.get(filepath)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    data = load_json_file(filepath)
+    _json_cache[filepath] = (mtime, data)
+    return data
+
+
 def get_player_rank_from_ranks_file(user_id: int, playlist: str = None) -> int:
     """Get player rank from ranks.json (website source of truth)
 
@@ -123,7 +149,7 @@ def get_player_rank_from_ranks_file(user_id: int, playlist: str = None) -> int:
     Returns:
         Rank level (1-50), defaults to 1 if not found
     """
-    ranks = load_json_file(RANKS_FILE)
+    ranks = load_json_file_cached(RANKS_FILE)
     user_key = str(user_id)
 
     if user_key not in ranks:
@@ -144,7 +170,7 @@ def get_player_rank_from_ranks_file(user_id: int, playlist: str = None) -> int:
 
 def get_all_players_from_ranks_file() -> dict:
     """Get all players from ranks.json with their rank data"""
-    return load_json_file(RANKS_FILE)
+    return load_json_file_cached(RANKS_FILE)
 
 
 async def async_load_ranks_from_github() -> dict:
@@ -153,7 +179,7 @@ async def async_load_ranks_from_github() -> dict:
     Uses local file directly instead of GitHub for up-to-date data.
     """
     # Always use local file - it's the source of truth
-    local_ranks = load_json_file(RANKS_FILE)
+    local_ranks = load_json_file_cached(RANKS_FILE)
     if local_ranks:
         print(f"[RANKS] Loaded {len(local_ranks)} players from local ranks.json")
         return local_ranks
@@ -201,8 +227,7 @@ def save_json_file(filepath: str, data: dict, skip_github: bool = False):
     Note: ranks.json is managed by the website - bot only reads it.
     Bot can still push gamestats.json and xp_config.json.
     """
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    json_io.save_file(filepath, data)
 
     # Push to GitHub unless skipped
     if not skip_github:
@@ -294,8 +319,8 @@ def get_player_stats(user_id: int, skip_github: bool = False) -> dict:
     The website calculates and stores all stats in ranks.json.
     MMR is read from rankstats.json for team balancing.
     """
-    ranks = load_json_file(RANKS_FILE)
-    mmr_data = load_json_file(MMR_FILE)
+    ranks = load_json_file_cached(RANKS_FILE)
+    mmr_data = load_json_file_cached(MMR_FILE)
     user_key = str(user_id)
 
     # Get MMR from MMR.json (if exists)
@@ -356,8 +381,8 @@ def get_existing_player_stats(user_id: int) -> dict:
     MMR is read from rankstats.json for team balancing.
     Returns stats if player exists in either ranks.json OR has MMR in rankstats.json.
     """
-    ranks = load_json_file(RANKS_FILE)
-    mmr_data = load_json_file(MMR_FILE)
+    ranks = load_json_file_cached(RANKS_FILE)
+    mmr_data = load_json_file_cached(MMR_FILE)
     user_key = str(user_id)
 
     # Get MMR from MMR.json (if exists)
@@ -517,10 +542,21 @@ def get_rank_progress(xp: int) -> Tuple[int, int, int]:
     
     return rank, xp_in_rank, xp_for_next
 
+# Parses the level out of a rank role name ("Level 12" -> 12)
+LEVEL_ROLE_RE = re.compile(r'^Level (\d+)$')
+
 def get_rank_role_name(level: int) -> str:
     """Get the role name for a rank level"""
     return f"Level {level}"
 
+def get_level_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
+    """Map rank role names to guild roles, for reuse across many role updates"""
+    level_roles = {}
+    for role in guild.roles:
+        if role.name.startswith("Level "):
+            level_roles.setdefault(role.name, role)
+    return level_roles
+
 async def send_playlist_rank_dm(guild: discord.Guild, member: discord.Member, old_level: int, new_level: int, playlist_name: str):
     """Send a DM notification for a playlist rank change"""
     try:
@@ -560,38 +596,40 @@ async def send_playlist_rank_dm(guild: discord.Guild, member: discord.Member, ol
         return False
 
 
-async def update_player_rank_role(guild: discord.Guild, user_id: int, new_level: int, send_dm: bool = True, playlist_name: str = None):
-    """Update player's rank role (Discord role only, DMs handled separately)"""
+async def update_player_rank_role(guild: discord.Guild, user_id: int, new_level: int, send_dm: bool = True, playlist_name: str = None,
+                                  level_roles: Dict[str, discord.Role] = None):
+    """Update player's rank role (Discord role only, DMs handled separately)
+
+    level_roles: optional get_level_roles() result, so bulk refreshes don't rescan guild.roles per player
+    """
     member = guild.get_member(user_id)
     if not member:
         return
 
-    # Check current level before making changes
+    # One pass over the member's roles: current level and all level roles (1-50) to remove
     old_level = None
+    roles_to_remove = []
     for role in member.roles:
         if role.name.startswith("Level "):
-            try:
-                old_level = int(role.name.replace("Level ", ""))
-                break
-            except ValueError:
-                pass
+            roles_to_remove.append(role)
+            if old_level is None:
+                match = LEVEL_ROLE_RE.match(role.name)
+                if match:
+                    old_level = int(match.group(1))
 
     # Skip if player already has the correct rank - no changes needed
     if old_level == new_level:
         return
 
-    # Remove all level roles (1-50)
-    roles_to_remove = []
-    for role in member.roles:
-        if role.name.startswith("Level "):
-            roles_to_remove.append(role)
-
     if roles_to_remove:
         await member.remove_roles(*roles_to_remove, reason="Rank update")
 
     # Add new level role
     new_role_name = get_rank_role_name(new_level)
-    new_role = discord.utils.get(guild.roles, name=new_role_name)
+    if level_roles is not None:
+        new_role = level_roles.get(new_role_name)
+    else:
+        new_role = discord.utils.get(guild.roles, name=new_role_name)
 
     if new_role:
         await member.add_roles(new_role, reason=f"Reached {new_role_name}")
@@ -656,13 +694,17 @@ async def record_manual_match(red_team: List[int], blue_team: List[int], games:
     Stats are calculated from xlsx files by populate_stats.py.
     This only records game stats (map/gametype) and refreshes Discord roles.
     """
-    # Count wins for each team (for logging only)
-    red_game_wins = sum(1 for g in games if g["winner"] == "RED")
-    blue_game_wins = sum(1 for g in games if g["winner"] == "BLUE")
-
     # Record game stats (map/gametype tracking) - this is still useful
-    for i, game in enumerate(games, 1):
-        record_game_stat(game["map"], game["gametype"], game["winner"])
+    # and count wins for each team (for logging only) in the same pass
+    red_game_wins = 0
+    blue_game_wins = 0
+    for game in games:
+        winner = game["winner"]
+        if winner == "RED":
+            red_game_wins += 1
+        elif winner == "BLUE":
+            blue_game_wins += 1
+        record_game_stat(game["map"], game["gametype"], winner)
 
     # Refresh ranks for all players from rankstats.json (populated by populate_stats.py)
     all_players = red_team + blue_team
@@ -671,6 +713,26 @@ async def record_manual_match(red_team: List[int], blue_team: List[int], games:
     match_label = f"#{match_number}" if match_number else ""
     print(f"✅ Manual match {match_label} logged: {series_winner} wins ({red_game_wins}-{blue_game_wins}) - stats via populate_stats.py")
 
+# Max rank role updates in flight at once (discord.py handles per-route rate limits)
+RANK_REFRESH_CONCURRENCY = 10
+
+
+async def _update_rank_roles(guild: discord.Guild, updates: List[Tuple[int, int]], send_dm: bool, playlist_name: str = None):
+    """Apply (user_id, rank) role updates concurrently, a few at a time"""
+    semaphore = asyncio.Semaphore(RANK_REFRESH_CONCURRENCY)
+    level_roles = get_level_roles(guild)
+
+    async def update_one(user_id: int, rank: int):
+        async with semaphore:
+            await update_player_rank_role(guild, user_id, rank, send_dm=send_dm, playlist_name=playlist_name,
+                                          level_roles=level_roles)
+
+    results = await asyncio.gather(*(update_one(uid, rank) for uid, rank in updates), return_exceptions=True)
+    for (user_id, _), result in zip(updates, results):
+        if isinstance(result, Exception):
+            print(f"[RANKS] Failed to update rank role for {user_id}: {result}")
+
+
 async def refresh_all_ranks(guild: discord.Guild, player_ids: List[int], send_dm: bool = True):
     """Refresh rank roles for all players - reads from local ranks.json"""
     from searchmatchmaking import queue_state
@@ -678,6 +740,7 @@ async def refresh_all_ranks(guild: discord.Guild, player_ids: List[int], send_dm
     # Load ranks.json from local file (source of truth)
     ranks = await async_load_ranks_from_github()
 
+    updates = []
     for user_id in player_ids:
         if user_id in queue_state.guests:
             continue  # Skip guests
@@ -690,7 +753,9 @@ async def refresh_all_ranks(guild: discord.Guild, player_ids: List[int], send_dm
         else:
             current_rank = 1
 
-        await update_player_rank_role(guild, user_id, current_rank, send_dm=send_dm)
+        updates.append((user_id, current_rank))
+
+    await _update_rank_roles(guild, updates, send_dm)
 
 
 async def refresh_playlist_ranks(guild: discord.Guild, player_ids: List[int], playlist_type: str, send_dm: bool = True):
@@ -707,6 +772,7 @@ async def refresh_playlist_ranks(guild: discord.Guild, player_ids: List[int], pl
     except:
         pass
 
+    updates = []
     for user_id in player_ids:
         user_key = str(user_id)
 
@@ -716,11 +782,13 @@ async def refresh_playlist_ranks(guild: discord.Guild, player_ids: List[int], pl
         else:
             current_rank = 1
 
-        await update_player_rank_role(guild, user_id, current_rank, send_dm=send_dm, playlist_name=playlist_name)
+        updates.append((user_id, current_rank))
+
+    await _update_rank_roles(guild, updates, send_dm, playlist_name=playlist_name)
 
 def get_all_players_sorted(sort_by: str = "rank") -> List[Tuple[str, dict]]:
     """Get all players sorted by specified criteria - reads from local ranks.json"""
-    ranks = load_json_file(RANKS_FILE)
+    ranks = load_json_file_cached(RANKS_FILE)
 
     players = []
     for user_id, player_data in ranks.items():
@@ -810,7 +878,7 @@ class LeaderboardView(discord.ui.View):
         """
         # MMR view - show all players from MMR.json
         if self.current_view == "MMR" or self.current_sort == "MMR":
-            mmr_data = load_json_file(MMR_FILE)
+            mmr_data = load_json_file_cached(MMR_FILE)
             ranks = await async_load_ranks_from_github()
 
             players = []
@@ -1101,6 +1169,7 @@ __all__ = [
     'get_all_playlist_ranks',
     'get_xp_config',
     'load_json_file',
+    'load_json_file_cached',
     'save_json_file',
     'async_load_ranks_from_github',
     'async_load_emblems',
@@ -1,7 +1,7 @@
 # commands.py - All Bot Commands
 # !! REMEMBER TO UPDATE VERSION NUMBER WHEN MAKING CHANGES !!
 
-MODULE_VERSION = "1.5.4"
+MODULE_VERSION = "1.5.13"
 
 import discord
 from discord import app_commands
@@ -311,18 +311,18 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
     @has_staff_role()
     async def add_player(interaction: discord.Interaction, user: discord.User):
         """Add player to queue"""
-        from searchmatchmaking import queue_state, update_queue_embed, update_ping_message, MAX_QUEUE_SIZE
+        from searchmatchmaking import queue_state, QueueEntry, update_queue_embed, update_ping_message, MAX_QUEUE_SIZE
         from pregame import start_pregame
         
-        if user.id in queue_state.queue:
+        if user.id in queue_state.entries:
             await interaction.response.send_message("❌ Player already in queue!", ephemeral=True)
             return
         
-        if len(queue_state.queue) >= MAX_QUEUE_SIZE:
+        if len(queue_state.entries) >= MAX_QUEUE_SIZE:
             await interaction.response.send_message("❌ Queue is full!", ephemeral=True)
             return
         
-        queue_state.queue.append(user.id)
+        queue_state.entries[user.id] = QueueEntry()
         queue_state.recent_action = {'type': 'join', 'user_id': user.id, 'name': user.name}
         log_action(f"Admin {interaction.user.name} added {user.name} to queue")
         
@@ -334,11 +334,11 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         await update_ping_message(interaction.guild)
         
         # Check if queue is now full
-        if len(queue_state.queue) == MAX_QUEUE_SIZE:
+        if len(queue_state.entries) == MAX_QUEUE_SIZE:
             await interaction.response.send_message(f"✅ Added {user.display_name} - Queue full! Starting pregame...", ephemeral=True)
             await start_pregame(channel if channel else interaction.channel)
         else:
-            await interaction.response.send_message(f"✅ Added {user.display_name} to queue ({len(queue_state.queue)}/{MAX_QUEUE_SIZE})", ephemeral=True)
+            await interaction.response.send_message(f"✅ Added {user.display_name} to queue ({len(queue_state.entries)}/{MAX_QUEUE_SIZE})", ephemeral=True)
     
     @bot.tree.command(name="removeplayer", description="[STAFF] Remove a player from current matchmaking")
     @has_staff_role()
@@ -377,8 +377,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         from searchmatchmaking import queue_state, queue_state_2, update_queue_embed, delete_ping_message, QUEUE_CHANNEL_ID_2
 
         # Clear main MLG 4v4 queue
-        queue_state.queue.clear()
-        queue_state.queue_join_times.clear()
+        queue_state.entries.clear()
         queue_state.pregame_timer_task = None
         queue_state.pregame_timer_end = None
         queue_state.recent_action = None
@@ -389,8 +388,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         queue_state.testers = []
 
         # Clear restricted MLG 4v4 queue (queue_state_2)
-        queue_state_2.queue.clear()
-        queue_state_2.queue_join_times.clear()
+        queue_state_2.entries.clear()
         queue_state_2.pregame_timer_task = None
         queue_state_2.pregame_timer_end = None
         queue_state_2.recent_action = None
@@ -609,7 +607,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
 
         # Clear state for the correct queue
         qs.current_series = None
-        qs.queue.clear()
+        qs.entries.clear()
         qs.test_mode = False
         qs.testers = []
         qs.locked = False
@@ -791,7 +789,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
 
         # Clear state for the correct queue
         qs.current_series = None
-        qs.queue.clear()
+        qs.entries.clear()
         qs.test_mode = False
         qs.testers = []
         qs.locked = False
@@ -1311,6 +1309,10 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         with open('queue_config.json', 'w') as f:
             json.dump(config, f, indent=2)
         
+        # Drop the cached copy so the queue buttons pick up the new roles
+        from searchmatchmaking import invalidate_queue_config
+        invalidate_queue_config()
+        
         # Push to GitHub
         try:
             import github_webhook
@@ -1340,6 +1342,10 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         with open('queue_config.json', 'w') as f:
             json.dump(config, f, indent=2)
         
+        # Drop the cached copy so the queue buttons pick up the new roles
+        from searchmatchmaking import invalidate_queue_config
+        invalidate_queue_config()
+        
         # Push to GitHub
         try:
             import github_webhook
@@ -1454,7 +1460,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         # Save state
         try:
             import state_manager
-            state_manager.save_state()
+            state_manager.request_save()
         except:
             pass
         
@@ -1837,11 +1843,11 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         host: discord.Member
     ):
         """Add a guest player to the queue attached to a host - guest MMR is half of host's MMR"""
-        from searchmatchmaking import queue_state, update_queue_embed, log_action, MAX_QUEUE_SIZE
+        from searchmatchmaking import queue_state, QueueEntry, update_queue_embed, log_action, MAX_QUEUE_SIZE
         from pregame import get_player_mmr
         
         # Check if host is in queue
-        if host.id not in queue_state.queue:
+        if host.id not in queue_state.entries:
             await interaction.response.send_message(
                 f"❌ {host.display_name} is not in the queue! They must join first.", 
                 ephemeral=True
@@ -1850,7 +1856,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         
         # Check if host already has a guest
         for guest_id, guest_info in queue_state.guests.items():
-            if guest_info["host_id"] == host.id and guest_id in queue_state.queue:
+            if guest_info["host_id"] == host.id and guest_id in queue_state.entries:
                 await interaction.response.send_message(
                     f"❌ {host.display_name} already has a guest in the queue!", 
                     ephemeral=True
@@ -1858,7 +1864,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
                 return
         
         # Check if queue is full
-        if len(queue_state.queue) >= MAX_QUEUE_SIZE:
+        if len(queue_state.entries) >= MAX_QUEUE_SIZE:
             await interaction.response.send_message("❌ Queue is already full!", ephemeral=True)
             return
         
@@ -1879,8 +1885,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         }
         
         # Add guest to queue
-        queue_state.queue.append(guest_id)
-        queue_state.queue_join_times[guest_id] = datetime.now()
+        queue_state.entries[guest_id] = QueueEntry(join_time=datetime.now())
         
         # Update embed
         if queue_state.queue_channel:
@@ -1905,7 +1910,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         # Find guest attached to this host
         guest_to_remove = None
         for guest_id, guest_info in queue_state.guests.items():
-            if guest_info["host_id"] == host.id and guest_id in queue_state.queue:
+            if guest_info["host_id"] == host.id and guest_id in queue_state.entries:
                 guest_to_remove = guest_id
                 break
         
@@ -1919,9 +1924,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         guest_name = queue_state.guests[guest_to_remove]["name"]
         
         # Remove from queue
-        queue_state.queue.remove(guest_to_remove)
-        if guest_to_remove in queue_state.queue_join_times:
-            del queue_state.queue_join_times[guest_to_remove]
+        queue_state.entries.pop(guest_to_remove, None)
         del queue_state.guests[guest_to_remove]
         
         # Update embed
@@ -2155,11 +2158,10 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         """Reset the matchmaking queue completely"""
         from searchmatchmaking import queue_state, update_queue_embed, log_action
         
-        old_count = len(queue_state.queue)
+        old_count = len(queue_state.entries)
         
         # Clear queue
-        queue_state.queue.clear()
-        queue_state.queue_join_times.clear()
+        queue_state.entries.clear()
         queue_state.guests.clear()
         queue_state.recent_action = None
         
@@ -2293,10 +2295,9 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         cleared_info = []
 
         if playlist == "all" or playlist == "mlg_4v4":
-            count = len(queue_state.queue)
+            count = len(queue_state.entries)
             if count > 0:
-                queue_state.queue.clear()
-                queue_state.queue_join_times.clear()
+                queue_state.entries.clear()
                 queue_state.guests.clear()
                 queue_state.recent_action = None
                 cleared_info.append(f"MLG 4v4: {count} players")
@@ -2348,7 +2349,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         stopped_info = []
 
         if playlist == "all" or playlist == "mlg_4v4":
-            count = len(queue_state.queue)
+            count = len(queue_state.entries)
             was_paused = queue_state.paused
             # Pause the queue
             queue_state.paused = True
@@ -2356,8 +2357,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
             queue_state.hide_player_names = True
             # Clear players
             if count > 0:
-                queue_state.queue.clear()
-                queue_state.queue_join_times.clear()
+                queue_state.entries.clear()
                 queue_state.guests.clear()
                 queue_state.recent_action = None
             if count > 0 or not was_paused:
@@ -2508,8 +2508,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
             return
 
         # Clear the queue since we're manually setting teams
-        queue_state.queue.clear()
-        queue_state.queue_join_times.clear()
+        queue_state.entries.clear()
 
         log_action(f"Admin {interaction.user.display_name} manually set teams for {playlist_name}")
         log_action(f"Red: {[m.display_name for m in red_members]}")
@@ -2799,8 +2798,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
             return
         
         # Clear the queue
-        queue_state.queue.clear()
-        queue_state.queue_join_times.clear()
+        queue_state.entries.clear()
         
         log_action(f"Admin {interaction.user.display_name} set guest match")
         log_action(f"Red: {red_names}")
@@ -2940,9 +2938,21 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         blue_team = match_data["blue_team"]
         games = match_data["games"]
         
-        # Calculate winner
-        red_wins = sum(1 for g in games if g["winner"] == "RED")
-        blue_wins = sum(1 for g in games if g["winner"] == "BLUE")
+        # Calculate winner and build the game results lines in one pass over games
+        red_emoji = f"<:redteam:{RED_TEAM_EMOJI_ID}>"
+        blue_emoji = f"<:blueteam:{BLUE_TEAM_EMOJI_ID}>"
+        red_wins = 0
+        blue_wins = 0
+        results_lines = []
+        for i, game in enumerate(games, 1):
+            if game["winner"] == "RED":
+                red_wins += 1
+                emoji = red_emoji
+            else:
+                if game["winner"] == "BLUE":
+                    blue_wins += 1
+                emoji = blue_emoji
+            results_lines.append(f"{emoji} Game {i} Winner - {game['map']} - {game['gametype']}\n")
         
         if red_wins > blue_wins:
             winner = "RED"
@@ -2984,15 +2994,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         embed.add_field(name="Final Score", value=f"Red **{red_wins}** - **{blue_wins}** Blue", inline=False)
         
         # Game results with map/gametype
-        results_text = ""
-        for i, game in enumerate(games, 1):
-            if game["winner"] == "RED":
-                emoji = f"<:redteam:{RED_TEAM_EMOJI_ID}>"
-            else:
-                emoji = f"<:blueteam:{BLUE_TEAM_EMOJI_ID}>"
-            results_text += f"{emoji} Game {i} Winner - {game['map']} - {game['gametype']}\n"
-        
-        embed.add_field(name="Game Results", value=results_text, inline=False)
+        embed.add_field(name="Game Results", value="".join(results_lines), inline=False)
         embed.set_footer(text="Manual Entry")
         
         # Post to queue channel
@@ -3384,8 +3386,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
 
         try:
             import playlists
-            import json
-            from playlists import PLAYLIST_MATCHES_FILES, get_playlist_state, show_playlist_match_embed
+            from playlists import PLAYLIST_MATCHES_FILES, get_playlist_state, show_playlist_match_embed, load_active_matches
         except ImportError as e:
             await interaction.followup.send(f"❌ Import error: {e}", ephemeral=True)
             return
@@ -3404,19 +3405,12 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
                 if not os.path.exists(history_file):
                     results.append(f"⚠️ {ptype}: Local file not found")
                     continue
-                with open(history_file, 'r') as f:
-                    local_data = json.load(f)
+                # Only active_matches is needed - skip loading the completed history
+                website_active = load_active_matches(history_file)
             except Exception as e:
                 results.append(f"❌ {ptype}: Failed to read local file - {e}")
                 continue
 
-            if not local_data:
-                results.append(f"⚠️ {ptype}: No data in local file")
-                continue
-
-            # Get active matches from local data
-            website_active = local_data.get("active_matches", [])
-
             if not website_active:
                 results.append(f"✓ {ptype}: No active matches on website")
                 continue
@@ -4142,6 +4136,9 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
         with open(STATSRANKS.MMR_FILE, 'w') as f:
             json.dump(mmr_data, f, indent=2)
 
+        from searchmatchmaking import mark_mmr_known
+        mark_mmr_known(player.id, value)
+
         await interaction.response.send_message(
             f"✅ Set {player.mention}'s MMR to **{value}**",
             ephemeral=True
@@ -4161,7 +4158,7 @@ def setup_commands(bot: commands.Bot, PREGAME_LOBBY_ID: int, POSTGAME_LOBBY_ID:
             player = interaction.user
 
         # Load MMR.json
-        mmr_data = STATSRANKS.load_json_file(STATSRANKS.MMR_FILE)
+        mmr_data = STATSRANKS.load_json_file_cached(STATSRANKS.MMR_FILE)
         user_key = str(player.id)
 
         # Check if player has MMR
@@ -3,11 +3,12 @@ github_webhook.py - Automatic GitHub Updates
 Pushes all JSON data files to GitHub whenever they're updated
 """
 
-MODULE_VERSION = "1.2.2"
+MODULE_VERSION = "1.3.1"
 
 import json
 import base64
 import os
+import threading
 from datetime import datetime, timezone, timedelta
 
 # EST timezone
@@ -46,6 +47,17 @@ JSON_FILES = {
     "playlists.json": "playlists.json"
 }
 
+# Background pushes - queue_push() snapshots a file's contents and hands them to one
+# worker thread so callers (including event-loop handlers) never wait on GitHub.
+# The bytes are read at queue time, so a later in-place rewrite of the file can't be
+# uploaded half-written. A file queued again before its push starts is uploaded once,
+# with its latest contents.
+_push_pending = {}  # local_file -> (github_path, commit_message, content)
+_push_lock = threading.Lock()
+_push_active = threading.Lock()  # Held while a batch is being pushed (worker or flush)
+_push_wakeup = threading.Event()
+_push_thread = None
+
 def log_github_action(message: str):
     """Log GitHub webhook actions (EST timezone)"""
     timestamp = datetime.now(EST).strftime('%Y-%m-%d %H:%M:%S EST')
@@ -147,7 +159,7 @@ async def async_pull_emblems_from_github() -> dict:
     return await async_pull_file_from_github("emblems.json")
 
 
-def push_file_to_github(local_file: str, github_path: str, commit_message: str = None) -> bool:
+def push_file_to_github(local_file: str, github_path: str, commit_message: str = None, content: str = None) -> bool:
     """
     Push a local file to GitHub repo
     
@@ -155,6 +167,7 @@ def push_file_to_github(local_file: str, github_path: str, commit_message: str =
         local_file: Local filename
         github_path: Path in the GitHub repo
         commit_message: Git commit message (auto-generated if None)
+        content: File contents already read by the caller (read from local_file if None)
     
     Returns:
         bool: True if successful, False otherwise
@@ -163,7 +176,7 @@ def push_file_to_github(local_file: str, github_path: str, commit_message: str =
         log_github_action("⚠️ GITHUB_TOKEN not set in .env file")
         return False
     
-    if not os.path.exists(local_file):
+    if content is None and not os.path.exists(local_file):
         log_github_action(f"⚠️ {local_file} not found")
         return False
     
@@ -178,8 +191,9 @@ def push_file_to_github(local_file: str, github_path: str, commit_message: str =
     
     try:
         # Read local file
-        with open(local_file, 'r') as f:
-            content = f.read()
+        if content is None:
+            with open(local_file, 'r') as f:
+                content = f.read()
         
         # Verify it's valid JSON
         json.loads(content)
@@ -229,18 +243,66 @@ def push_file_to_github(local_file: str, github_path: str, commit_message: str =
         return False
 
 
-# Convenience functions for each file type
+def _push_batch():
+    """Push everything queued so far (caller holds _push_active)"""
+    with _push_lock:
+        pending = dict(_push_pending)
+        _push_pending.clear()
+        _push_wakeup.clear()
+    for local_file, (github_path, commit_message, content) in pending.items():
+        push_file_to_github(local_file, github_path, commit_message, content)
+
+def _push_worker():
+    """Push queued files one at a time, forever (daemon thread)"""
+    while True:
+        _push_wakeup.wait()
+        with _push_active:
+            _push_batch()
+
+def queue_push(local_file: str, github_path: str, commit_message: str = None) -> bool:
+    """
+    Push a local file to GitHub in the background.
+
+    Returns:
+        bool: True once queued (the push result is logged by the worker)
+    """
+    global _push_thread
+    # Snapshot the contents now - the caller has just finished writing the file
+    try:
+        with open(local_file, 'r') as f:
+            content = f.read()
+    except FileNotFoundError:
+        log_github_action(f"⚠️ {local_file} not found")
+        return False
+    except Exception as e:
+        log_github_action(f"❌ Exception reading {local_file}: {e}")
+        return False
+    with _push_lock:
+        _push_pending[local_file] = (github_path, commit_message, content)
+        if _push_thread is None or not _push_thread.is_alive():
+            _push_thread = threading.Thread(target=_push_worker, name="github-push", daemon=True)
+            _push_thread.start()
+        _push_wakeup.set()
+    return True
+
+def flush_pending_pushes():
+    """Synchronously push anything still queued, after any push already in progress (shutdown)"""
+    with _push_active:
+        _push_batch()
+
+
+# Convenience functions for each file type (pushed in the background)
 def update_matchhistory_on_github():
     """Push MLG4v4.json to GitHub (legacy name kept for compatibility)"""
-    return push_file_to_github("MLG4v4.json", "MLG4v4.json")
+    return queue_push("MLG4v4.json", "MLG4v4.json")
 
 def update_testmatchhistory_on_github():
     """Push testMLG4v4.json to GitHub (obsolete - kept for compatibility)"""
-    return push_file_to_github("testMLG4v4.json", "testMLG4v4.json")
+    return queue_push("testMLG4v4.json", "testMLG4v4.json")
 
 def update_mmr_on_github():
     """Push MMR.json to GitHub"""
-    return push_file_to_github("MMR.json", "MMR.json")
+    return queue_push("MMR.json", "MMR.json")
 
 def update_rankstats_on_github():
     """DEPRECATED: Use update_mmr_on_github instead. Kept for backwards compatibility."""
@@ -248,7 +310,7 @@ def update_rankstats_on_github():
 
 def update_gamestats_on_github():
     """Push gamestats.json to GitHub"""
-    return push_file_to_github("gamestats.json", "gamestats.json")
+    return queue_push("gamestats.json", "gamestats.json")
 
 def update_players_on_github():
     """DISABLED - players.json contains confidential data and stays on server only"""
@@ -257,11 +319,11 @@ def update_players_on_github():
 
 def update_queue_config_on_github():
     """Push queue_config.json to GitHub"""
-    return push_file_to_github("queue_config.json", "queue_config.json")
+    return queue_push("queue_config.json", "queue_config.json")
 
 def update_xp_config_on_github():
     """Push xp_config.json to GitHub"""
-    return push_file_to_github("xp_config.json", "xp_config.json")
+    return queue_push("xp_config.json", "xp_config.json")
 
 def update_all_on_github():
     """Push all JSON files to GitHub"""
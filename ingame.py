@@ -1,6 +1,6 @@
 # ingame.py - In-Game Series Management and Voting
 
-MODULE_VERSION = "1.5.0"
+MODULE_VERSION = "1.5.3"
 
 import discord
 from discord.ui import View, Button
@@ -395,9 +395,10 @@ class SeriesView(View):
 
         # Add completed games section if any (populated from parsed stats)
         if series.games:
-            games_text = ""
-            for i, winner in enumerate(series.games, 1):
-                games_text += format_game_result(i, winner, series.game_stats)
+            games_text = "".join(
+                format_game_result(i, winner, series.game_stats)
+                for i, winner in enumerate(series.games, 1)
+            )
 
             embed.add_field(
                 name="Completed Games",
@@ -414,17 +415,14 @@ class SeriesView(View):
             inline=False
         )
 
+        # Also update general chat embed - the two edits are independent, so send them together
+        import asyncio
+        edits = [update_general_chat_embed(channel.guild, series)]
         if series.series_message:
-            try:
-                await series.series_message.edit(embed=embed, view=self)
-            except:
-                pass
-
-        # Also update general chat embed
-        try:
-            await update_general_chat_embed(channel.guild, series)
-        except Exception as e:
-            log_action(f"Failed to update general chat embed: {e}")
+            edits.append(series.series_message.edit(embed=embed, view=self))
+        results = await asyncio.gather(*edits, return_exceptions=True)
+        if isinstance(results[0], Exception):
+            log_action(f"Failed to update general chat embed: {results[0]}")
 
 
 async def record_game_to_series(
@@ -494,21 +492,24 @@ async def record_game_to_series(
     if not series_channel:
         series_channel = guild.get_channel(QUEUE_CHANNEL_ID)
 
-    # Find or create the view to update embed
+    # Find or create the view to update embed (this also refreshes the general chat embed)
+    general_updated = False
     if series.series_message:
         view = SeriesView(series)
         try:
             await view.update_series_embed(series_channel)
-            log_action(f"[GAME] Updated series embed with Game {game_number} result")
+            general_updated = True
+            log_action(f"[GAME] Updated series and general chat embeds with Game {game_number} result")
         except Exception as e:
             log_action(f"[GAME] Failed to update series embed: {e}")
 
-    # Also update general chat embed
-    try:
-        await update_general_chat_embed(guild, series)
-        log_action(f"[GAME] Updated general chat embed")
-    except Exception as e:
-        log_action(f"[GAME] Failed to update general chat embed: {e}")
+    # No series embed was updated - refresh general chat embed on its own
+    if not general_updated:
+        try:
+            await update_general_chat_embed(guild, series)
+            log_action(f"[GAME] Updated general chat embed")
+        except Exception as e:
+            log_action(f"[GAME] Failed to update general chat embed: {e}")
 
     # Check for auto-end threshold
     red_wins = series.games.count('RED')
@@ -632,14 +633,13 @@ async def show_series_embed(channel: discord.TextChannel):
     view = SeriesView(series)
     series.series_message = await target_channel.send(embed=embed, view=view)
 
-    # Ping the match role (separate from embed)
+    # Ping the match players (separate from embed)
+    from searchmatchmaking import get_match_players
     match_number = series.match_number if hasattr(series, 'match_number') else 1
     playlist_name = getattr(series, 'playlist_name', 'MLG4v4')
-    clean_playlist = playlist_name.replace(" ", "").replace("_", "")
-    match_role_name = f"{clean_playlist}Match{match_number}"
-    match_role = discord.utils.get(channel.guild.roles, name=match_role_name)
-    if match_role:
-        await target_channel.send(match_role.mention)
+    match_players = get_match_players(playlist_name, match_number)
+    if match_players:
+        await target_channel.send(" ".join(f"<@{uid}>" for uid in match_players))
 
     # Also send to general chat (no buttons)
     try:
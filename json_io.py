@@ -0,0 +1,44 @@
+"""
+json_io.py - Shared JSON load/dump helpers
+Uses orjson (Rust, several times faster) when installed, stdlib json otherwise
+"""
+
+MODULE_VERSION = "1.0.0"
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: bool = True) -> bytes:
+    """Serialize to JSON bytes - 2-space indented, or compact with indent=False"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2).encode()
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def load_file(path: str):
+    """Load a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def save_file(path: str, data, indent: bool = True):
+    """Write data to a JSON file (2-space indented unless indent=False)"""
+    with open(path, 'wb') as f:
+        f.write(dumps(data, indent))
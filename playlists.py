@@ -1,7 +1,7 @@
 # playlists.py - Multi-Playlist Queue System
 # !! REMEMBER TO UPDATE VERSION NUMBER WHEN MAKING CHANGES !!
 
-MODULE_VERSION = "1.3.0"
+MODULE_VERSION = "1.3.4"
 
 import discord
 from discord.ui import View, Button
@@ -12,6 +12,12 @@ import random
 import json
 import os
 
+# Streaming JSON parser - lets read-only lookups skip materializing whole history files
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 # Header image for embeds and DMs
 HEADER_IMAGE_URL = "https://raw.githubusercontent.com/I2aMpAnT/H2CarnageReport.com/main/MessagefromCarnageReportHEADERSMALL.png"
 
@@ -164,6 +170,26 @@ def get_playlist_completed_file(playlist_type: str) -> str:
     """Get the completed matches file path for a playlist (e.g., mlg_4v4_completed.json)"""
     return PLAYLIST_COMPLETED_FILES.get(playlist_type, f"{playlist_type}_completed.json")
 
+def load_active_matches(matches_file: str) -> list:
+    """Read only the active_matches list of a matches file (read-only callers).
+    The file also holds the full completed history - with ijson it is streamed past
+    instead of being loaded into memory."""
+    with open(matches_file, 'rb') as f:
+        if ijson is not None:
+            return list(ijson.items(f, 'active_matches.item', use_float=True))
+        return json.load(f).get("active_matches", [])
+
+def completed_game_filenames(completed_file: str):
+    """Yield the filename of every game in a completed matches file (streamed with ijson if available)"""
+    with open(completed_file, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, 'matches.item.games.item.filename')
+            return
+        data = json.load(f)
+    for match in data.get("matches", []):
+        for game in match.get("games", []):
+            yield game.get("filename")
+
 
 def log_action(message: str):
     """Log actions to log.txt (EST timezone)"""
@@ -497,7 +523,7 @@ def save_match_to_history(match: PlaylistMatch, result: str, guild=None):
     # Sync to GitHub
     try:
         import github_webhook
-        github_webhook.push_file_to_github(matches_file, matches_file)
+        github_webhook.queue_push(matches_file, matches_file)
     except Exception as e:
         log_action(f"Failed to sync {matches_file} to GitHub: {e}")
 
@@ -509,13 +535,12 @@ def find_active_match_by_players(playlist_type: str, player_ids: List[int]) -> O
         return None
 
     try:
-        with open(matches_file, 'r') as f:
-            data = json.load(f)
+        active_matches = load_active_matches(matches_file)
     except:
         return None
 
     game_players = set(player_ids)
-    for active in data.get("active_matches", []):
+    for active in active_matches:
         active_players = set(active.get("team1_ids", []) + active.get("team2_ids", []))
         if game_players == active_players:
             return active
@@ -646,9 +671,7 @@ def is_game_already_assigned(playlist_type: str, filename: str) -> bool:
     matches_file = get_playlist_matches_file(playlist_type)
     if os.path.exists(matches_file):
         try:
-            with open(matches_file, 'r') as f:
-                data = json.load(f)
-            for active in data.get("active_matches", []):
+            for active in load_active_matches(matches_file):
                 for game in active.get("games", []):
                     if game.get("filename") == filename:
                         return True
@@ -659,12 +682,8 @@ def is_game_already_assigned(playlist_type: str, filename: str) -> bool:
     completed_file = get_playlist_completed_file(playlist_type)
     if os.path.exists(completed_file):
         try:
-            with open(completed_file, 'r') as f:
-                data = json.load(f)
-            for match in data.get("matches", []):
-                for game in match.get("games", []):
-                    if game.get("filename") == filename:
-                        return True
+            if filename in completed_game_filenames(completed_file):
+                return True
         except:
             pass
 
@@ -990,7 +1009,7 @@ def create_series_embed(series_data: dict, guild: discord.Guild = None, red_emoj
 
     # Game results
     if games:
-        games_text = ""
+        games_lines = []
         for game in games:
             winner = game.get("winner", "")
             map_name = game.get("map", "Unknown")
@@ -1027,11 +1046,11 @@ def create_series_embed(series_data: dict, guild: discord.Guild = None, red_emoj
                 else:
                     game_line = f"{team_emoji} **{team_color} Team** won on {map_name}"
 
-            games_text += game_line + "\n"
+            games_lines.append(game_line)
 
         embed.add_field(
             name="Game Results",
-            value=games_text.strip(),
+            value="\n".join(games_lines).strip(),
             inline=False
         )
 
@@ -1154,7 +1173,7 @@ def update_active_match_in_history(match: PlaylistMatch):
     # Sync to GitHub
     try:
         import github_webhook
-        github_webhook.push_file_to_github(matches_file, matches_file)
+        github_webhook.queue_push(matches_file, matches_file)
     except Exception as e:
         log_action(f"Failed to sync {matches_file} to GitHub: {e}")
 
@@ -1190,7 +1209,7 @@ def remove_match_from_active(match: PlaylistMatch):
         # Sync to GitHub
         try:
             import github_webhook
-            github_webhook.push_file_to_github(matches_file, matches_file)
+            github_webhook.queue_push(matches_file, matches_file)
         except:
             pass
 
@@ -1562,8 +1581,8 @@ async def start_playlist_match(channel: discord.TextChannel, playlist_state: Pla
 
     if ps.playlist_type == PlaylistType.MLG_4V4:
         # MLG 4v4: Use existing pregame system with team selection voting
-        from searchmatchmaking import queue_state
-        queue_state.queue = players
+        from searchmatchmaking import queue_state, QueueEntry
+        queue_state.entries = {uid: QueueEntry() for uid in players}
         await start_pregame(channel)
     else:
         # Team Hardcore, Double Team, Head to Head: Route through pregame with playlist params
@@ -1699,7 +1718,7 @@ async def show_playlist_match_embed(channel: discord.TextChannel, match: Playlis
 
     # Show completed games (populated from parsed stats)
     if match.games:
-        games_text = ""
+        games_lines = []
         for i, winner in enumerate(match.games, 1):
             stats = match.game_stats.get(i, {})
             map_name = stats.get("map", "")
@@ -1709,14 +1728,14 @@ async def show_playlist_match_embed(channel: discord.TextChannel, match: Playlis
             else:
                 winner_label = "🔴" if winner == "TEAM1" else "🔵"
             if map_name and gametype:
-                games_text += f"Game {i}: {winner_label} - {map_name} - {gametype}\n"
+                games_lines.append(f"Game {i}: {winner_label} - {map_name} - {gametype}")
             elif map_name:
-                games_text += f"Game {i}: {winner_label} - {map_name}\n"
+                games_lines.append(f"Game {i}: {winner_label} - {map_name}")
             else:
-                games_text += f"Game {i}: {winner_label}\n"
+                games_lines.append(f"Game {i}: {winner_label}")
         embed.add_field(
             name="Completed Games",
-            value=games_text.strip(),
+            value="\n".join(games_lines),
             inline=False
         )
 
@@ -2076,7 +2095,7 @@ def save_playlist_stats(match: PlaylistMatch, guild=None):
     # Sync to GitHub
     try:
         import github_webhook
-        github_webhook.push_file_to_github(stats_file, stats_file)
+        github_webhook.queue_push(stats_file, stats_file)
     except Exception as e:
         log_action(f"Failed to sync {stats_file} to GitHub: {e}")
 
@@ -2427,7 +2446,14 @@ async def post_match_results(channel: discord.TextChannel, match: PlaylistMatch,
 
     # Game-by-game results
     if match.games:
-        games_text = ""
+        games_lines = []
+        if ps.playlist_type == PlaylistType.HEAD_TO_HEAD:
+            # Player names don't change between games - look them up once
+            player1 = guild.get_member(match.team1[0])
+            player2 = guild.get_member(match.team2[0])
+            p1_name = player1.display_name if player1 else "Player 1"
+            p2_name = player2.display_name if player2 else "Player 2"
+
         for i, winner in enumerate(match.games, 1):
             stats = match.game_stats.get(i, {})
             map_name = stats.get("map", "Unknown")
@@ -2436,16 +2462,11 @@ async def post_match_results(channel: discord.TextChannel, match: PlaylistMatch,
 
             if ps.playlist_type == PlaylistType.HEAD_TO_HEAD:
                 # Format: {winner_name} won {gametype} on {map}!
-                player1 = guild.get_member(match.team1[0])
-                player2 = guild.get_member(match.team2[0])
-                p1_name = player1.display_name if player1 else "Player 1"
-                p2_name = player2.display_name if player2 else "Player 2"
-
                 winner_name = p1_name if winner == "TEAM1" else p2_name
                 if gametype:
-                    games_text += f"**{winner_name}** won {gametype} on {map_name}!\n"
+                    games_lines.append(f"**{winner_name}** won {gametype} on {map_name}!")
                 else:
-                    games_text += f"**{winner_name}** won on {map_name}!\n"
+                    games_lines.append(f"**{winner_name}** won on {map_name}!")
             else:
                 # Format: {logo} {Color} Team won {gametype} on {map} - {score}
                 if winner == "TEAM1":
@@ -2456,15 +2477,15 @@ async def post_match_results(channel: discord.TextChannel, match: PlaylistMatch,
                     team_color = "Blue"
 
                 if gametype and score:
-                    games_text += f"{logo} **{team_color} Team** won {gametype} on {map_name} - {score}\n"
+                    games_lines.append(f"{logo} **{team_color} Team** won {gametype} on {map_name} - {score}")
                 elif gametype:
-                    games_text += f"{logo} **{team_color} Team** won {gametype} on {map_name}\n"
+                    games_lines.append(f"{logo} **{team_color} Team** won {gametype} on {map_name}")
                 else:
-                    games_text += f"{logo} **{team_color} Team** won on {map_name}\n"
+                    games_lines.append(f"{logo} **{team_color} Team** won on {map_name}")
 
         embed.add_field(
             name="Game Results",
-            value=games_text.strip(),
+            value="\n".join(games_lines).strip(),
             inline=False
         )
 
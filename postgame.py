@@ -1,6 +1,6 @@
 # postgame.py - Postgame Processing, Stats Recording, and Cleanup
 
-MODULE_VERSION = "1.4.1"
+MODULE_VERSION = "1.4.9"
 
 import discord
 from discord.ui import View, Button
@@ -8,6 +8,7 @@ from typing import List
 from datetime import datetime, timezone, timedelta
 import json
 import os
+import json_io
 
 # Will be imported from bot.py
 POSTGAME_LOBBY_ID = None
@@ -24,6 +25,40 @@ TIMEZONE = EST
 TIMEZONE_NAME = "EST"
 
 
+# Parsed match history files, reused while the file is unchanged on disk
+# {history_file: (mtime_ns, history)}
+_history_cache = {}
+
+
+def load_history_file(history_file: str, default: dict) -> dict:
+    """Load a match history file, reusing the parsed copy if the file hasn't changed since"""
+    try:
+        mtime = os.stat(history_file).st_mtime_ns
+    except OSError:
+        return default
+
+    cached = _history_cache.get(history_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        history = json_io.load_file(history_file)
+    except:
+        return default
+    _history_cache[history_file] = (mtime, history)
+    return history
+
+
+def save_history_file(history_file: str, history: dict):
+    """Write a match history file and keep the parsed copy for the next load"""
+    try:
+        json_io.save_file(history_file, history)
+    except:
+        _history_cache.pop(history_file, None)  # Cached copy no longer matches disk
+        raise
+    _history_cache[history_file] = (os.stat(history_file).st_mtime_ns, history)
+
+
 def get_est_now():
     """Get current time in EST"""
     return datetime.now(TIMEZONE)
@@ -236,20 +271,10 @@ def save_match_history(series, winner: str):
         history_file = 'testMLG4v4.json'
 
     # Load existing history or create new
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        except:
-            if match_type == "RANKED":
-                history = {"total_ranked_matches": 0, "matches": [], "timezone": TIMEZONE_NAME}
-            else:
-                history = {"total_test_matches": 0, "matches": [], "timezone": TIMEZONE_NAME}
+    if match_type == "RANKED":
+        history = load_history_file(history_file, {"total_ranked_matches": 0, "matches": [], "timezone": TIMEZONE_NAME})
     else:
-        if match_type == "RANKED":
-            history = {"total_ranked_matches": 0, "matches": [], "timezone": TIMEZONE_NAME}
-        else:
-            history = {"total_test_matches": 0, "matches": [], "timezone": TIMEZONE_NAME}
+        history = load_history_file(history_file, {"total_test_matches": 0, "matches": [], "timezone": TIMEZONE_NAME})
 
     # Ensure timezone is set
     history["timezone"] = TIMEZONE_NAME
@@ -264,8 +289,7 @@ def save_match_history(series, winner: str):
     history["matches"].append(match_entry)
 
     # Save back to file
-    with open(history_file, 'w') as f:
-        json.dump(history, f, indent=2)
+    save_history_file(history_file, history)
 
     log_action(f"Saved {match_type} match {series.series_number} to {history_file} (UTC)")
 
@@ -310,7 +334,7 @@ async def record_game_winner(series_view, winner: str, channel: discord.TextChan
     # Save state
     try:
         import state_manager
-        state_manager.save_state()
+        state_manager.request_save()
     except:
         pass
     
@@ -349,8 +373,6 @@ async def record_game_winner(series_view, winner: str, channel: discord.TextChan
 
 def log_individual_game(series, game_number: int, winner: str):
     """Log individual game result to JSON immediately"""
-    import json
-    import os
     from datetime import datetime
     
     timestamp = datetime.now().isoformat()
@@ -379,24 +401,16 @@ def log_individual_game(series, game_number: int, winner: str):
         }
     }
     
-    # Load or create file
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        except:
-            history = {key: 0, "games": [], "matches": []}
-    else:
-        history = {key: 0, "games": [], "matches": []}
+    # Load or create file (parsed copy is reused between games)
+    history = load_history_file(history_file, {key: 0, "games": [], "matches": []})
     
     # Ensure games array exists
     if "games" not in history:
         history["games"] = []
     
     history["games"].append(game_entry)
-    
-    with open(history_file, 'w') as f:
-        json.dump(history, f, indent=2)
+
+    save_history_file(history_file, history)
     
     log_action(f"Logged individual game {game_number} to {history_file}")
     
@@ -577,7 +591,6 @@ async def end_series(series_view_or_channel, channel: discord.TextChannel = None
 
 def save_series_for_stats_matching(series):
     """Save series data for later stats matching"""
-    import json
     import os
 
     pending_file = 'pending_series.json'
@@ -586,8 +599,7 @@ def save_series_for_stats_matching(series):
     pending = []
     if os.path.exists(pending_file):
         try:
-            with open(pending_file, 'r') as f:
-                pending = json.load(f)
+            pending = json_io.load_file(pending_file)
         except:
             pending = []
 
@@ -606,11 +618,17 @@ def save_series_for_stats_matching(series):
         "game_stats": {str(k): v for k, v in series.game_stats.items()},
     }
 
+    # Nothing to write if this exact series is already pending
+    if series_data in pending:
+        log_action(f"Series #{series.match_number} already saved for stats matching")
+        return
+
     pending.append(series_data)
 
-    # Save back
-    with open(pending_file, 'w') as f:
-        json.dump(pending, f, indent=2)
+    # Save back - write a temp file and rename it over the original so a crash can't truncate it
+    tmp_file = pending_file + '.tmp'
+    json_io.save_file(tmp_file, pending)
+    os.replace(tmp_file, pending_file)
 
     log_action(f"Saved series #{series.match_number} for stats matching")
 
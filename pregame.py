@@ -2,7 +2,7 @@
 # !! REMEMBER TO UPDATE VERSION NUMBER WHEN MAKING CHANGES !!
 # Supports ALL playlists: MLG 4v4 (voting), Team Hardcore/Double Team (auto-balance), Head to Head (1v1)
 
-MODULE_VERSION = "1.8.4"
+MODULE_VERSION = "1.8.7"
 
 import discord
 from discord.ui import View, Button, Select
@@ -2669,8 +2669,7 @@ async def finalize_teams(channel: discord.TextChannel, red_team: List[int], blue
 
     if not test_mode:
         # Clear queue since match is starting (only for real matches)
-        qs.queue.clear()
-        qs.queue_join_times.clear()
+        qs.entries.clear()
 
         # Update queue embed to show it's empty and ready for new players
         from searchmatchmaking import update_queue_embed, QUEUE_CHANNEL_ID, QUEUE_CHANNEL_ID_2
@@ -2724,7 +2723,7 @@ async def finalize_teams(channel: discord.TextChannel, red_team: List[int], blue
     # Save state
     try:
         import state_manager
-        state_manager.save_state()
+        state_manager.request_save()
     except:
         pass
 
@@ -1,13 +1,28 @@
 # searchmatchmaking.py - MLG 4v4 Queue Management System
 # !! REMEMBER TO UPDATE VERSION NUMBER WHEN MAKING CHANGES !!
 
-MODULE_VERSION = "1.7.2"
+MODULE_VERSION = "2.0.11"
 
 import discord
 from discord.ui import View, Button
 from typing import List, Optional
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import asyncio
+import json
+import os
+import STATSRANKS
+import state_manager
+from ingame import Series
+from pregame import start_pregame
+
+# Playlist queues - matched players are pulled out of these too
+try:
+    from playlists import get_all_playlists
+except ImportError:
+    def get_all_playlists():
+        return []
 
 # Header image for embeds and DMs
 HEADER_IMAGE_URL = "https://raw.githubusercontent.com/I2aMpAnT/H2CarnageReport.com/main/MessagefromCarnageReportHEADERSMALL.png"
@@ -20,6 +35,7 @@ QUEUE_CHANNEL_ID = None
 QUEUE_CHANNEL_ID_2 = None  # Second MLG 4v4 queue channel
 QUEUE_2_BANNED_ROLE = None  # Role banned from queue 2
 
+@lru_cache(maxsize=16)  # Pure function of player_count - only 9 distinct results
 def get_queue_progress_image(player_count: int) -> str:
     """Get the queue progress image URL for current player count, or None if empty"""
     if player_count < 1:
@@ -28,12 +44,37 @@ def get_queue_progress_image(player_count: int) -> str:
         player_count = 8
     return f"{MATCHMAKING_IMAGE_BASE}/{player_count}outof8.png"
 
+def _format_elapsed(seconds: int, with_seconds: bool = True) -> str:
+    """Format a time-in-queue duration: '1h 5m', '12m 30s' (or '12m'), '45s'"""
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {secs}s" if with_seconds else f"{minutes}m"
+    return f"{secs}s"
+
+# Queue Entry
+class QueueEntry:
+    """A player's place in a queue"""
+    __slots__ = ("join_time", "last_activity")
+
+    def __init__(self, join_time: Optional[datetime] = None, last_activity: Optional[datetime] = None):
+        self.join_time = join_time  # When they joined (for display)
+        self.last_activity = last_activity  # Last activity (for inactivity check)
+
 # Queue State
 class QueueState:
-    def __init__(self):
-        self.queue: List[int] = []
-        self.queue_join_times: dict = {}  # user_id -> datetime (when they joined, for display)
-        self.last_activity_times: dict = {}  # user_id -> datetime (for inactivity check)
+    def __init__(self, display_name: str = "MLG 4v4", title: str = "MLG 4v4 Matchmaking",
+                 is_restricted: bool = False):
+        # Static queue embed skeleton
+        self.display_name: str = display_name  # Queue name for logs and ping messages
+        self.title: str = title  # Queue embed title
+        self.base_desc: str = "*Classic 4v4 with team selection vote*"  # Queue embed description
+        self.is_restricted: bool = is_restricted  # Banned-role restricted queue (queue 2)
+        self.embed: Optional[discord.Embed] = None  # Queue embed, mutated in place on each refresh
+        self.embed_image_count: int = 0  # Player count the embed's progress image was set for
+        self.entries: dict = {}  # user_id -> QueueEntry, in join order
         self.current_series = None
         self.pregame_timer_task: Optional[asyncio.Task] = None
         self.pregame_timer_end: Optional[datetime] = None
@@ -47,6 +88,11 @@ class QueueState:
         self.queue_channel: Optional[discord.TextChannel] = None  # Store channel for updates
         self.last_ping_time: Optional[datetime] = None  # Last time ping was used
         self.ping_message: Optional[discord.Message] = None  # Ping message in general chat
+        self.queue_message: Optional[discord.Message] = None  # Queue embed message in queue channel
+        self.queue_message_id: Optional[int] = None  # ID of queue embed (edited via partial message)
+        self.embed_dirty: bool = False  # Queue embed needs a refresh
+        self.embed_channel: Optional[discord.TextChannel] = None  # Channel for the pending refresh
+        self.embed_flush_task: Optional[asyncio.Task] = None  # Debounced embed refresh task
         self.hide_player_names: bool = False  # Hide player names in queue list
         self.guests: dict = {}  # guest_id -> {"host_id": int, "mmr": int, "name": str}
         self.guest_counter: int = 1000000  # Start guest IDs at 1 million to avoid conflicts
@@ -58,11 +104,12 @@ class QueueState:
         self.series_text_channel_id: Optional[int] = None  # Series text channel (created early, renamed when teams set)
         self.pending_match_number: Optional[int] = None  # Match number assigned when queue fills (for early role assignment)
         self.playlist_name: str = "MLG4v4"  # Playlist name for dynamic role naming
+        self.queue_cond: asyncio.Condition = asyncio.Condition()  # Notified on join/leave (wakes inactivity check)
 
 # Global queue states - separate queues for each channel
 queue_state = QueueState()  # Primary MLG 4v4 queue
 queue_state.playlist_name = "MLG4v4"
-queue_state_2 = QueueState()  # Second MLG 4v4 queue (with banned role restriction)
+queue_state_2 = QueueState(display_name="Halo 2 Chill Lobby", title="Halo 2 Chill Lobby", is_restricted=True)  # Second MLG 4v4 queue (with banned role restriction)
 queue_state_2.playlist_name = "MLG4v4"
 
 def get_queue_state(channel_id: int):
@@ -78,17 +125,160 @@ GENERAL_CHANNEL_ID = 1403855176460406805
 PING_COOLDOWN_MINUTES = 15
 INACTIVITY_CHECK_MINUTES = 60  # Time before prompting user (1 hour)
 INACTIVITY_RESPONSE_MINUTES = 5  # Time user has to respond
+INACTIVITY_DM_CONCURRENCY = 3  # Max inactivity DMs in flight at once (Discord per-route rate limit)
+QUEUE_EMBED_DEBOUNCE_SECONDS = 0.3  # Queue embed refreshes within this window collapse into one edit
+
+# EST timezone (for log timestamps)
+EST = timezone(timedelta(hours=-5))
 
 def log_action(message: str):
     """Log actions to log.txt (EST timezone)"""
-    from datetime import timezone, timedelta
-    EST = timezone(timedelta(hours=-5))
     timestamp = datetime.now(EST).strftime('%Y-%m-%d %H:%M:%S EST')
     with open('log.txt', 'a') as f:
         f.write(f"[{timestamp}] {message}\n")
     print(f"[LOG] {message}")
 
 
+# Parsed queue_config.json (banned/required roles) - see load_queue_config()
+_queue_config_cache: Optional[dict] = None
+_queue_config_mtime: int = 0
+
+def load_queue_config() -> dict:
+    """Load queue_config.json, re-parsing only when the file's mtime changes"""
+    global _queue_config_cache, _queue_config_mtime
+    try:
+        mtime = os.stat('queue_config.json').st_mtime_ns
+    except OSError:
+        mtime = 0
+    if _queue_config_cache is None or mtime != _queue_config_mtime:
+        config = {}
+        if mtime:
+            try:
+                with open('queue_config.json', 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                log_action(f"Failed to load queue_config.json: {e}")
+        config["_banned_set"] = frozenset(config.get('banned_roles', []))
+        config["_required_set"] = frozenset(config.get('required_roles', []))
+        config["_role_ids"] = {}  # guild_id -> (banned_ids, required_ids)
+        _queue_config_cache = config
+        _queue_config_mtime = mtime
+    return _queue_config_cache
+
+def invalidate_queue_config():
+    """Drop the cached queue config (call after queue_config.json is edited)"""
+    global _queue_config_cache
+    _queue_config_cache = None
+
+def get_queue_role_ids(guild: discord.Guild, config: dict) -> tuple:
+    """Resolve banned/required role names to role ID sets (once per guild per config load)"""
+    role_ids = config["_role_ids"].get(guild.id)
+    if role_ids is None:
+        banned_set = config["_banned_set"]
+        required_set = config["_required_set"]
+        banned_ids = frozenset(role.id for role in guild.roles if role.name in banned_set)
+        required_ids = frozenset(role.id for role in guild.roles if role.name in required_set)
+        role_ids = (banned_ids, required_ids)
+        config["_role_ids"][guild.id] = role_ids
+    return role_ids
+
+
+# Role IDs resolved by name - (guild_id, role_name) -> role_id, see get_cached_role()
+_role_id_cache: dict = {}
+
+def get_cached_role(guild: discord.Guild, name: str) -> Optional[discord.Role]:
+    """Resolve a role by name, scanning guild.roles only on the first lookup"""
+    role_id = _role_id_cache.get((guild.id, name))
+    role = guild.get_role(role_id) if role_id else None
+    if role is None:
+        role = discord.utils.get(guild.roles, name=name)
+        if role:
+            _role_id_cache[(guild.id, name)] = role.id
+    return role
+
+def get_searching_role(guild: discord.Guild) -> Optional[discord.Role]:
+    """Get the SearchingMatchmaking role (cached per guild)"""
+    return get_cached_role(guild, "SearchingMatchmaking")
+
+def invalidate_role_cache(guild_id: int):
+    """Drop cached role IDs for a guild (call when its roles are renamed or deleted)"""
+    for key in [k for k in _role_id_cache if k[0] == guild_id]:
+        del _role_id_cache[key]
+    if _queue_config_cache is not None:
+        _queue_config_cache["_role_ids"].pop(guild_id, None)
+
+
+# Display names by user ID for the queue embed - see get_display_name()
+_display_name_cache: dict = {}
+
+def get_display_name(guild: discord.Guild, user_id: int) -> str:
+    """Get a member's display name, remembering it until their profile changes"""
+    name = _display_name_cache.get(user_id)
+    if name is None:
+        member = guild.get_member(user_id)
+        if not member:
+            # Fallback to mention if member not in cache
+            return f"<@{user_id}>"
+        name = member.display_name
+        _display_name_cache[user_id] = name
+    return name
+
+def invalidate_display_name(user_id: int):
+    """Drop a cached display name (call when a member's nickname or username changes)"""
+    _display_name_cache.pop(user_id, None)
+
+
+# MMR by user ID for players known to have one - only /mmr writes MMR.json, so
+# entries are kept current by mark_mmr_known() and never need re-reading
+_mmr_known: Optional[dict] = None
+
+def get_known_mmr(user_id: int) -> Optional[int]:
+    """Get a player's MMR (None if unrated) without re-reading MMR.json for known players"""
+    global _mmr_known
+    if _mmr_known is None:
+        try:
+            mmr_data = STATSRANKS.load_json_file(STATSRANKS.MMR_FILE)
+            _mmr_known = {int(uid): data["mmr"] for uid, data in mmr_data.items() if "mmr" in data}
+        except Exception as e:
+            log_action(f"Failed to load MMR index: {e}")
+            _mmr_known = {}
+    if user_id in _mmr_known:
+        return _mmr_known[user_id]
+    player_stats = STATSRANKS.get_existing_player_stats(user_id)
+    if player_stats and 'mmr' in player_stats:
+        _mmr_known[user_id] = player_stats['mmr']
+        return player_stats['mmr']
+    return None
+
+def mark_mmr_known(user_id: int, mmr: int):
+    """Record a player's new MMR (call after /mmr assigns one)"""
+    if _mmr_known is not None:
+        _mmr_known[user_id] = mmr
+
+
+# Per-user locks for queue buttons - user_id -> [lock, holders + waiters]
+_user_locks: dict = {}
+
+@asynccontextmanager
+async def user_lock(user_id: int):
+    """Serialize queue button handlers for one user (entry is dropped once nobody uses it)"""
+    entry = _user_locks.get(user_id)
+    if entry is None:
+        entry = _user_locks[user_id] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _user_locks[user_id]
+
+def is_in_any_queue(user_id: int) -> bool:
+    """Check if a user is searching in either MLG 4v4 queue"""
+    return user_id in queue_state.entries or user_id in queue_state_2.entries
+
+
 async def remove_players_from_other_queues(guild: discord.Guild, player_ids: list, current_queue=None):
     """Remove matched players from all other queues they might be in"""
     removed_from = []
@@ -96,26 +286,19 @@ async def remove_players_from_other_queues(guild: discord.Guild, player_ids: lis
     # Remove from other MLG 4v4 queue
     other_qs = queue_state_2 if current_queue == queue_state else queue_state
     for user_id in player_ids:
-        if user_id in other_qs.queue:
-            other_qs.queue.remove(user_id)
-            if user_id in other_qs.queue_join_times:
-                del other_qs.queue_join_times[user_id]
-            if user_id in other_qs.last_activity_times:
-                del other_qs.last_activity_times[user_id]
-            removed_from.append("Halo 2 Chill Lobby" if other_qs == queue_state_2 else "MLG 4v4")
+        if other_qs.entries.pop(user_id, None) is not None:
+            removed_from.append(other_qs.display_name)
 
     # Remove from playlist queues
     try:
-        from playlists import get_all_playlists
         for ps in get_all_playlists():
             for user_id in player_ids:
                 if user_id in ps.queue:
                     ps.queue.remove(user_id)
-                    if user_id in ps.queue_join_times:
-                        del ps.queue_join_times[user_id]
+                    ps.queue_join_times.pop(user_id, None)
                     removed_from.append(ps.name)
-    except:
-        pass
+    except Exception as e:
+        log_action(f"Failed to remove matched players from playlist queues: {e}")
 
     if removed_from:
         log_action(f"Removed {len(player_ids)} matched players from other queues: {', '.join(set(removed_from))}")
@@ -128,22 +311,47 @@ async def remove_players_from_other_queues(guild: discord.Guild, player_ids: lis
             pass
 
 
+# In-memory match index (replaces per-match {playlist}Match{#} Discord roles)
+# user_id -> (clean_playlist, match_number)
+_user_to_match: dict = {}
+
+
+def clean_playlist_name(playlist_name: str) -> str:
+    """Playlist name as used in role names (no spaces/underscores)"""
+    return playlist_name.replace(" ", "").replace("_", "")
+
+
+def get_match_players(playlist_name: str, match_number: int) -> List[int]:
+    """Get the user IDs indexed to a playlist match"""
+    key = (clean_playlist_name(playlist_name), match_number)
+    return [uid for uid, match in _user_to_match.items() if match == key]
+
+
+def get_match_index() -> dict:
+    """Match index in JSON-friendly form (for state_manager)"""
+    return {str(uid): [playlist, number] for uid, (playlist, number) in _user_to_match.items()}
+
+
+def restore_match_index(data: dict):
+    """Restore the match index saved by get_match_index()"""
+    _user_to_match.clear()
+    for uid_str, (playlist, number) in data.items():
+        _user_to_match[int(uid_str)] = (playlist, number)
+
+
 async def add_active_match_roles(guild: discord.Guild, player_ids: list, playlist_name: str, match_number: int):
     """
     Add active matchmaking roles to players when they're locked into a match.
     - Removes SearchingMatchmaking role
     - Adds Active{playlist} role (e.g., ActiveMLG4v4) - for pinging all active matches in playlist
-    - Adds {playlist}Match{#} role (e.g., MLG4v4Match1) - for pinging specific match
+    - Indexes players to the match in memory (no per-match role is created)
     """
-    import asyncio
-
     # Clean playlist name for role (remove spaces)
-    clean_playlist = playlist_name.replace(" ", "").replace("_", "")
+    clean_playlist = clean_playlist_name(playlist_name)
     playlist_role_name = f"Active{clean_playlist}"
-    match_role_name = f"{clean_playlist}Match{match_number}"
 
-    # Get or create playlist-specific role (e.g., ActiveMLG4v4)
-    playlist_role = discord.utils.get(guild.roles, name=playlist_role_name)
+    # Get or create playlist-specific role (e.g., ActiveMLG4v4) - kept between matches
+    playlist_role = get_cached_role(guild, playlist_role_name)
     if not playlist_role:
         try:
             playlist_role = await guild.create_role(
@@ -155,28 +363,17 @@ async def add_active_match_roles(guild: discord.Guild, player_ids: list, playlis
         except Exception as e:
             log_action(f"Failed to create {playlist_role_name} role: {e}")
 
-    # Create match-specific role (e.g., MLG4v4Match1)
-    match_role = discord.utils.get(guild.roles, name=match_role_name)
-    if not match_role:
-        try:
-            match_role = await guild.create_role(
-                name=match_role_name,
-                color=discord.Color.purple(),
-                reason=f"Auto-created for {playlist_name} Match #{match_number}"
-            )
-            log_action(f"Created role: {match_role_name}")
-        except Exception as e:
-            log_action(f"Failed to create {match_role_name} role: {e}")
+    # Index players to this match
+    for uid in player_ids:
+        _user_to_match[uid] = (clean_playlist, match_number)
 
     # Get SearchingMatchmaking role to remove
-    searching_role = discord.utils.get(guild.roles, name="SearchingMatchmaking")
+    searching_role = get_searching_role(guild)
 
     # Build list of roles to add/remove for each member
     roles_to_add = []
     if playlist_role:
         roles_to_add.append(playlist_role)
-    if match_role:
-        roles_to_add.append(match_role)
 
     async def update_member_roles(user_id):
         """Update roles for a single member"""
@@ -205,25 +402,27 @@ async def add_active_match_roles(guild: discord.Guild, player_ids: list, playlis
     # Run all role updates in parallel
     await asyncio.gather(*[update_member_roles(uid) for uid in player_ids], return_exceptions=True)
 
-    log_action(f"Added active match roles to {len(player_ids)} players: {playlist_role_name} + {match_role_name}")
+    log_action(f"Added active match roles to {len(player_ids)} players: {playlist_role_name} ({clean_playlist} Match #{match_number})")
 
 
 async def remove_active_match_roles(guild: discord.Guild, player_ids: list, playlist_name: str, match_number: int):
     """
     Remove active matchmaking roles from players when series ends or is cancelled.
+    - Drops the players from the in-memory match index
     - Removes Active{playlist} role (only if no other active matches in that playlist)
-    - Removes and deletes the {playlist}Match{#} role
     """
-    import asyncio
-
     # Clean playlist name for role
-    clean_playlist = playlist_name.replace(" ", "").replace("_", "")
+    clean_playlist = clean_playlist_name(playlist_name)
     playlist_role_name = f"Active{clean_playlist}"
-    match_role_name = f"{clean_playlist}Match{match_number}"
+    match_key = (clean_playlist, match_number)
+
+    # Drop this match from the index
+    for uid in player_ids:
+        if _user_to_match.get(uid) == match_key:
+            del _user_to_match[uid]
 
-    # Get roles
-    playlist_role = discord.utils.get(guild.roles, name=playlist_role_name)
-    match_role = discord.utils.get(guild.roles, name=match_role_name)
+    # Get role
+    playlist_role = get_cached_role(guild, playlist_role_name)
 
     async def remove_member_roles(user_id):
         """Remove roles from a single member"""
@@ -232,47 +431,19 @@ async def remove_active_match_roles(guild: discord.Guild, player_ids: list, play
             return
 
         try:
-            roles_to_remove = []
-            if match_role and match_role in member.roles:
-                roles_to_remove.append(match_role)
+            # Keep the playlist role if player is still indexed to another match in this playlist
+            other_match = _user_to_match.get(user_id)
+            if other_match and other_match[0] == clean_playlist:
+                return
 
-            # Check if player has any OTHER active match roles for this playlist before removing playlist role
             if playlist_role and playlist_role in member.roles:
-                has_other_active = False
-                for role in member.roles:
-                    # Check for other match roles in this playlist (e.g., MLG4v4Match2)
-                    if role.name.startswith(f"{clean_playlist}Match") and role.name != match_role_name:
-                        has_other_active = True
-                        break
-                if not has_other_active:
-                    roles_to_remove.append(playlist_role)
-
-            if roles_to_remove:
-                await member.remove_roles(*roles_to_remove)
+                await member.remove_roles(playlist_role)
         except Exception as e:
             log_action(f"Failed to remove roles from {member.display_name}: {e}")
 
     # Run all role removals in parallel
     await asyncio.gather(*[remove_member_roles(uid) for uid in player_ids], return_exceptions=True)
 
-    # Delete both roles when match ends
-    if match_role:
-        try:
-            await match_role.delete(reason=f"Match #{match_number} ended")
-            log_action(f"Deleted role: {match_role_name}")
-        except Exception as e:
-            log_action(f"Failed to delete {match_role_name} role: {e}")
-
-    # Also delete the playlist role if no one else has it
-    if playlist_role:
-        # Check if any other members still have this role
-        if len(playlist_role.members) == 0:
-            try:
-                await playlist_role.delete(reason=f"No active {playlist_name} matches")
-                log_action(f"Deleted role: {playlist_role_name}")
-            except Exception as e:
-                log_action(f"Failed to delete {playlist_role_name} role: {e}")
-
     log_action(f"Removed active match roles from {len(player_ids)} players for {playlist_name} Match #{match_number}")
 
 
@@ -286,7 +457,7 @@ async def auto_update_queue_times(qs=None):
     while True:
         try:
             # Only update if there are players in queue
-            if qs.queue and qs.queue_channel:
+            if qs.entries and qs.queue_channel:
                 await update_queue_embed(qs.queue_channel, qs)
             await asyncio.sleep(10)  # Update every 10 seconds
         except asyncio.CancelledError:
@@ -331,8 +502,9 @@ class InactivityConfirmView(View):
         self.responded = True
 
         # Reset their activity time to give them another hour (keep original join time for display)
-        if self.user_id in self.qs.queue:
-            self.qs.last_activity_times[self.user_id] = datetime.now()
+        entry = self.qs.entries.get(self.user_id)
+        if entry:
+            entry.last_activity = datetime.now()
             log_action(f"User {interaction.user.display_name} confirmed to stay in queue - activity timer reset")
 
             # Clean up pending confirmation
@@ -371,7 +543,7 @@ class InactivityConfirmView(View):
         self.responded = True
 
         # Remove from queue
-        if self.user_id in self.qs.queue:
+        if self.user_id in self.qs.entries:
             # Get guild - use interaction.guild if available, otherwise get from queue_channel (for DM buttons)
             guild = interaction.guild or (self.qs.queue_channel.guild if self.qs.queue_channel else None)
             if guild:
@@ -393,7 +565,7 @@ class InactivityConfirmView(View):
 
     async def on_timeout(self):
         """Called when the view times out (no response in 5 minutes)"""
-        if not self.responded and self.user_id in self.qs.queue:
+        if not self.responded and self.user_id in self.qs.entries:
             # Need to get guild from somewhere - use stored channel
             if self.qs.queue_channel:
                 guild = self.qs.queue_channel.guild
@@ -405,37 +577,26 @@ async def remove_inactive_user(guild: discord.Guild, user_id: int, qs=None, reas
     if qs is None:
         qs = queue_state  # Default to primary queue
 
-    if user_id not in qs.queue:
+    if user_id not in qs.entries:
         return
 
     # Don't remove if user is locked into a match
     if user_id in qs.locked_players:
         return
 
+    # Remove from queue
+    entry = qs.entries.pop(user_id)
+    state_manager.log_queue_leave(qs, user_id)
+
     # Calculate time in queue
     time_in_queue = ""
-    if user_id in qs.queue_join_times:
-        join_time = qs.queue_join_times[user_id]
-        elapsed = datetime.now() - join_time
-        total_minutes = int(elapsed.total_seconds() / 60)
-
-        if total_minutes >= 60:
-            hours = total_minutes // 60
-            mins = total_minutes % 60
-            time_in_queue = f"{hours}h {mins}m"
-        else:
-            time_in_queue = f"{total_minutes}m"
-
-        del qs.queue_join_times[user_id]
-    if user_id in qs.last_activity_times:
-        del qs.last_activity_times[user_id]
+    if entry.join_time:
+        time_in_queue = _format_elapsed(int((datetime.now() - entry.join_time).total_seconds()))
 
     # Get member for display name and role removal
     member = guild.get_member(user_id)
     display_name = member.display_name if member else f"User {user_id}"
 
-    # Remove from queue
-    qs.queue.remove(user_id)
     qs.recent_action = {
         'type': 'leave',
         'user_id': user_id,
@@ -443,37 +604,37 @@ async def remove_inactive_user(guild: discord.Guild, user_id: int, qs=None, reas
         'time_in_queue': time_in_queue,
         'reason': reason  # e.g., "AFK" for inactivity kicks
     }
+    await notify_queue_changed(qs)
 
-    queue_name = "Halo 2 Chill Lobby" if qs == queue_state_2 else "MLG 4v4"
-    log_action(f"{display_name} removed from {queue_name} ({reason}) after {time_in_queue} ({len(qs.queue)}/{MAX_QUEUE_SIZE})")
+    queue_name = qs.display_name
+    log_action(f"{display_name} removed from {queue_name} ({reason}) after {time_in_queue} ({len(qs.entries)}/{MAX_QUEUE_SIZE})")
 
-    # Remove SearchingMatchmaking role
-    if member:
+    async def remove_searching_role():
+        """Remove SearchingMatchmaking role"""
+        if not member or is_in_any_queue(user_id):
+            return
         try:
-            searching_role = discord.utils.get(guild.roles, name="SearchingMatchmaking")
-            if searching_role:
+            searching_role = get_searching_role(guild)
+            if searching_role and searching_role in member.roles:
                 await member.remove_roles(searching_role)
                 log_action(f"Removed SearchingMatchmaking role from {display_name}")
         except Exception as e:
             log_action(f"Failed to remove SearchingMatchmaking role: {e}")
 
-    # Clean up pending confirmation messages
-    await cleanup_inactivity_messages(user_id, qs)
-
-    # Save state
-    try:
-        import state_manager
-        state_manager.save_state()
-    except:
-        pass
-
-    # Update queue embed
+    # Role removal, prompt cleanup and embed refreshes are independent - run them together
+    tasks = [
+        remove_searching_role(),
+        cleanup_inactivity_messages(user_id, qs),  # Clean up pending confirmation messages
+    ]
     if qs.queue_channel:
-        await update_queue_embed(qs.queue_channel, qs)
-
-    # Update ping message if exists (only for primary queue)
+        tasks.append(update_queue_embed(qs.queue_channel, qs))
     if qs == queue_state:
-        await update_ping_message(guild)
+        tasks.append(update_ping_message(guild))  # Ping message only exists for primary queue
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            log_action(f"Error while removing {display_name} from queue: {result}")
 
 
 async def cleanup_inactivity_messages(user_id: int, qs=None):
@@ -481,9 +642,8 @@ async def cleanup_inactivity_messages(user_id: int, qs=None):
     if qs is None:
         qs = queue_state  # Default to primary queue
 
-    if user_id in qs.inactivity_pending:
-        pending = qs.inactivity_pending[user_id]
-
+    pending = qs.inactivity_pending.pop(user_id, None)
+    if pending:
         # Try to delete the general chat message
         if pending.get("general_message"):
             try:
@@ -502,8 +662,6 @@ async def cleanup_inactivity_messages(user_id: int, qs=None):
             except:
                 pass
 
-        del qs.inactivity_pending[user_id]
-
 
 async def send_inactivity_prompt(guild: discord.Guild, user_id: int, qs=None):
     """Send inactivity prompt to user via DM only"""
@@ -551,6 +709,15 @@ async def send_inactivity_prompt(guild: discord.Guild, user_id: int, qs=None):
         }
 
 
+async def notify_queue_changed(qs=None):
+    """Wake the inactivity checker after players join or leave"""
+    if qs is None:
+        qs = queue_state  # Default to primary queue
+
+    async with qs.queue_cond:
+        qs.queue_cond.notify_all()
+
+
 async def check_queue_inactivity(qs=None):
     """Background task to check for inactive users in queue"""
     if qs is None:
@@ -560,14 +727,33 @@ async def check_queue_inactivity(qs=None):
 
     while True:
         try:
+            # Empty queue - sleep until someone joins instead of polling.
+            # The timeout covers players added without a notify (nobody can
+            # be due a prompt sooner than INACTIVITY_CHECK_MINUTES after joining)
+            if not qs.entries:
+                async with qs.queue_cond:
+                    try:
+                        await asyncio.wait_for(
+                            qs.queue_cond.wait_for(lambda: bool(qs.entries)),
+                            timeout=INACTIVITY_CHECK_MINUTES * 60
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                continue
+
             now = datetime.now()
+            due_users = []  # Users to send an inactivity prompt to this tick
 
             # Check each user in queue
-            for user_id in list(qs.queue):  # Use list() to avoid modification during iteration
+            for user_id in list(qs.entries):  # Use list() to avoid modification during iteration
+                entry = qs.entries.get(user_id)
+                if entry is None:
+                    continue  # Removed while an earlier user was being handled
+
                 # Skip if user already has a pending confirmation
-                if user_id in qs.inactivity_pending:
+                pending = qs.inactivity_pending.get(user_id)
+                if pending:
                     # Check if the pending confirmation has timed out
-                    pending = qs.inactivity_pending[user_id]
                     prompt_time = pending.get("prompt_time")
                     if prompt_time:
                         elapsed = now - prompt_time
@@ -589,18 +775,31 @@ async def check_queue_inactivity(qs=None):
                         # Exempt if: in voice, NOT in AFK channel, and NOT deafened
                         if not is_in_afk and not voice_state.self_deaf and not voice_state.deaf:
                             # User is active in voice - reset their activity timer (not join time)
-                            qs.last_activity_times[user_id] = now
+                            entry.last_activity = now
                             continue
 
                 # Check how long since last activity (for inactivity kick)
-                last_activity = qs.last_activity_times.get(user_id)
+                last_activity = entry.last_activity
                 if last_activity:
                     elapsed = now - last_activity
                     if elapsed.total_seconds() >= INACTIVITY_CHECK_MINUTES * 60:
                         # User has been in queue for 1 hour - send prompt
                         if qs.queue_channel:
-                            guild = qs.queue_channel.guild
-                            await send_inactivity_prompt(guild, user_id, qs)
+                            due_users.append(user_id)
+
+            # Send due prompts concurrently, a few at a time
+            if due_users:
+                guild = qs.queue_channel.guild
+                dm_semaphore = asyncio.Semaphore(INACTIVITY_DM_CONCURRENCY)
+
+                async def send_one(uid):
+                    async with dm_semaphore:
+                        await send_inactivity_prompt(guild, uid, qs)
+
+                results = await asyncio.gather(*[send_one(uid) for uid in due_users], return_exceptions=True)
+                for uid, result in zip(due_users, results):
+                    if isinstance(result, Exception):
+                        log_action(f"Error sending inactivity prompt to {uid}: {result}")
 
             # Check every 30 seconds for more responsive timeout handling
             await asyncio.sleep(30)
@@ -618,262 +817,236 @@ class QueueView(View):
     
     @discord.ui.button(label="Join Matchmaking", style=discord.ButtonStyle.success, custom_id="join_queue")
     async def join_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_id = interaction.user.id
-        user_roles = [role.name for role in interaction.user.roles]
+        # One handler at a time per user - a double-click must not join/leave twice
+        async with user_lock(interaction.user.id):
+            user_id = interaction.user.id
 
-        # Get the correct queue state for this channel
-        qs = get_queue_state(interaction.channel.id)
+            # Get the correct queue state for this channel
+            qs = get_queue_state(interaction.channel.id)
 
-        # Check if matchmaking is paused
-        if qs.paused:
-            await interaction.response.send_message(
-                "⏸️ **Sorry, Matchmaking is currently paused.**\n\nPlease wait for a staff member to resume it.",
-                ephemeral=True
-            )
-            return
-
-        # Check if user has banned role for queue channel 2
-        if interaction.channel.id == QUEUE_CHANNEL_ID_2 and QUEUE_2_BANNED_ROLE:
-            if QUEUE_2_BANNED_ROLE in user_roles:
+            # Check if matchmaking is paused
+            if qs.paused:
                 await interaction.response.send_message(
-                    "❌ **You cannot join this queue.**\n\nPlease use the main MLG 4v4 queue instead.",
+                    "⏸️ **Sorry, Matchmaking is currently paused.**\n\nPlease wait for a staff member to resume it.",
                     ephemeral=True
                 )
                 return
 
-        # Check banned/required roles
-        import json
-        import os
-        if os.path.exists('queue_config.json'):
-            try:
-                with open('queue_config.json', 'r') as f:
-                    config = json.load(f)
-                
-                # Check banned roles
-                banned = config.get('banned_roles', [])
-                if any(role in banned for role in user_roles):
-                    await interaction.response.send_message("❌ You have a banned role and cannot queue!", ephemeral=True)
-                    return
-                
-                # Check required roles
-                required = config.get('required_roles', [])
-                if required and not any(role in required for role in user_roles):
-                    await interaction.response.send_message(f"❌ You need one of these roles to queue: {', '.join(required)}", ephemeral=True)
+            # Check if user has banned role for queue channel 2
+            if interaction.channel.id == QUEUE_CHANNEL_ID_2 and QUEUE_2_BANNED_ROLE:
+                queue_2_banned = get_cached_role(interaction.guild, QUEUE_2_BANNED_ROLE)
+                if queue_2_banned and interaction.user.get_role(queue_2_banned.id):
+                    await interaction.response.send_message(
+                        "❌ **You cannot join this queue.**\n\nPlease use the main MLG 4v4 queue instead.",
+                        ephemeral=True
+                    )
                     return
-            except:
-                pass
-        
-        # Check if player has MMR stats
-        import STATSRANKS
-        player_stats = STATSRANKS.get_existing_player_stats(user_id)
-        has_mmr = player_stats and 'mmr' in player_stats
-        response_sent = False  # Track if we've already responded
-
-        if not has_mmr:
-            # Notify player they don't have MMR - they can still join but will get temp 500 MMR
-            await interaction.response.send_message(
-                "⚠️ **You don't have an MMR rating yet!**\n\n"
-                "You can still join the queue, but you'll be assigned a **temporary 500 MMR** if a staff member doesn't set your MMR before the match starts.\n"
-                "A staff member has been notified to set your MMR.",
-                ephemeral=True
-            )
-            response_sent = True
-            # Send alert to general chat for staff
-            GENERAL_CHANNEL_ID = 1403855176460406805
-            general_channel = interaction.guild.get_channel(GENERAL_CHANNEL_ID)
-            if general_channel:
-                embed = discord.Embed(
-                    title="⚠️ New Player Needs MMR",
-                    description=f"{interaction.user.mention} joined matchmaking but doesn't have an MMR rating.\n\n"
-                               f"Please use `/mmr` to assign them a starting MMR before the match starts!\n"
-                               f"**They will get 500 MMR temporarily if not set.**",
-                    color=discord.Color.orange()
-                )
-                embed.set_footer(text="Player joined queue - set MMR ASAP")
-                # Ping @Server Support role by name
-                server_support_role = discord.utils.get(interaction.guild.roles, name="Server Support")
-                role_ping = server_support_role.mention if server_support_role else "@Server Support"
-                await general_channel.send(
-                    content=role_ping,
-                    embed=embed
-                )
-            # Continue to add them to queue (don't return)
 
-        # Check if already in this queue
-        if user_id in qs.queue:
-            await interaction.response.send_message("You're already in this queue!", ephemeral=True)
-            return
+            # Check banned/required roles
+            config = load_queue_config()
+            banned_ids, required_ids = get_queue_role_ids(interaction.guild, config)
+            user_role_ids = {role.id for role in interaction.user.roles}
 
-        # Allow joining multiple queues - no blocking checks
-        # Players will be removed from other queues when they get matched
+            # Check banned roles
+            if not user_role_ids.isdisjoint(banned_ids):
+                await interaction.response.send_message("❌ You have a banned role and cannot queue!", ephemeral=True)
+                return
 
-        # Check if queue is full
-        if len(qs.queue) >= MAX_QUEUE_SIZE:
-            await interaction.response.send_message("Matchmaking is full!", ephemeral=True)
-            return
+            # Check required roles
+            required = config.get('required_roles', [])
+            if required and user_role_ids.isdisjoint(required_ids):
+                await interaction.response.send_message(f"❌ You need one of these roles to queue: {', '.join(required)}", ephemeral=True)
+                return
 
-        # Check if player is in the current match (can't queue while playing)
-        if qs.current_series:
-            if user_id in qs.current_series.red_team or user_id in qs.current_series.blue_team:
-                await interaction.response.send_message("You're in the current match! Finish it first.", ephemeral=True)
+            # Check if player has MMR stats
+            mmr = get_known_mmr(user_id)
+            has_mmr = mmr is not None
+            response_sent = False  # Track if we've already responded
+
+            if not has_mmr:
+                # Notify player they don't have MMR - they can still join but will get temp 500 MMR
+                await interaction.response.send_message(
+                    "⚠️ **You don't have an MMR rating yet!**\n\n"
+                    "You can still join the queue, but you'll be assigned a **temporary 500 MMR** if a staff member doesn't set your MMR before the match starts.\n"
+                    "A staff member has been notified to set your MMR.",
+                    ephemeral=True
+                )
+                response_sent = True
+                # Send alert to general chat for staff
+                GENERAL_CHANNEL_ID = 1403855176460406805
+                general_channel = interaction.guild.get_channel(GENERAL_CHANNEL_ID)
+                if general_channel:
+                    embed = discord.Embed(
+                        title="⚠️ New Player Needs MMR",
+                        description=f"{interaction.user.mention} joined matchmaking but doesn't have an MMR rating.\n\n"
+                                   f"Please use `/mmr` to assign them a starting MMR before the match starts!\n"
+                                   f"**They will get 500 MMR temporarily if not set.**",
+                        color=discord.Color.orange()
+                    )
+                    embed.set_footer(text="Player joined queue - set MMR ASAP")
+                    # Ping @Server Support role by name
+                    server_support_role = get_cached_role(interaction.guild, "Server Support")
+                    role_ping = server_support_role.mention if server_support_role else "@Server Support"
+                    await general_channel.send(
+                        content=role_ping,
+                        embed=embed
+                    )
+                # Continue to add them to queue (don't return)
+
+            # Check if already in this queue
+            if user_id in qs.entries:
+                await interaction.response.send_message("You're already in this queue!", ephemeral=True)
                 return
 
-        # Add to queue with join time
-        qs.queue.append(user_id)
-        qs.queue_join_times[user_id] = datetime.now()
-        qs.last_activity_times[user_id] = datetime.now()  # For inactivity check
+            # Allow joining multiple queues - no blocking checks
+            # Players will be removed from other queues when they get matched
 
-        # Clear recent action if this user was the one who left (they're rejoining)
-        if qs.recent_action and qs.recent_action.get('user_id') == user_id:
-            qs.recent_action = None
+            # Check if queue is full
+            if len(qs.entries) >= MAX_QUEUE_SIZE:
+                await interaction.response.send_message("Matchmaking is full!", ephemeral=True)
+                return
+
+            # Check if player is in the current match (can't queue while playing)
+            if qs.current_series:
+                if user_id in qs.current_series.red_team or user_id in qs.current_series.blue_team:
+                    await interaction.response.send_message("You're in the current match! Finish it first.", ephemeral=True)
+                    return
 
-        queue_name = "Halo 2 Chill Lobby" if qs == queue_state_2 else "MLG 4v4"
-        mmr_display = player_stats['mmr'] if has_mmr else "PENDING (500)"
-        log_action(f"{interaction.user.display_name} joined {queue_name} ({len(qs.queue)}/{MAX_QUEUE_SIZE}) - MMR: {mmr_display}")
+            # Add to queue with join time
+            now = datetime.now()
+            qs.entries[user_id] = QueueEntry(join_time=now, last_activity=now)
+            state_manager.log_queue_join(qs, user_id)  # Logged before any await so it can't land after a fill
+            _display_name_cache[user_id] = interaction.user.display_name
+            await notify_queue_changed(qs)
+
+            # Clear recent action if this user was the one who left (they're rejoining)
+            if qs.recent_action and qs.recent_action.get('user_id') == user_id:
+                qs.recent_action = None
+
+            queue_name = qs.display_name
+            mmr_display = mmr if has_mmr else "PENDING (500)"
+            log_action(f"{interaction.user.display_name} joined {queue_name} ({len(qs.entries)}/{MAX_QUEUE_SIZE}) - MMR: {mmr_display}")
         
-        # Add SearchingMatchmaking role
-        try:
-            searching_role = discord.utils.get(interaction.guild.roles, name="SearchingMatchmaking")
-            if searching_role:
-                await interaction.user.add_roles(searching_role)
-                log_action(f"Added SearchingMatchmaking role to {interaction.user.display_name}")
-        except Exception as e:
-            log_action(f"Failed to add SearchingMatchmaking role: {e}")
+            # Add SearchingMatchmaking role
+            try:
+                searching_role = get_searching_role(interaction.guild)
+                if searching_role and searching_role not in interaction.user.roles:
+                    await interaction.user.add_roles(searching_role)
+                    log_action(f"Added SearchingMatchmaking role to {interaction.user.display_name}")
+            except Exception as e:
+                log_action(f"Failed to add SearchingMatchmaking role: {e}")
         
-        # Save state
-        try:
-            import state_manager
-            state_manager.save_state()
-        except:
-            pass
+            # Only defer if we haven't already responded (no MMR warning sent)
+            if not response_sent:
+                await interaction.response.defer()
+
+            # A filling join repaints the embed once, after the queue is cleared below
+            if len(qs.entries) < MAX_QUEUE_SIZE:
+                await update_queue_embed(interaction.channel, qs)
+
+            # Update ping message if exists (only for primary queue)
+            if qs == queue_state:
+                await update_ping_message(interaction.guild)
+
+            # Start pregame if queue is full
+            if len(qs.entries) == MAX_QUEUE_SIZE:
+                # Lock players immediately - they cannot leave once queue is full
+                qs.locked = True
+                # Hand the players over to locked_players and start a fresh queue in one step,
+                # so nobody who joins while match roles are assigned gets wiped with them
+                qs.locked_players = list(qs.entries)
+                qs.entries = {}
+                log_action(f"Queue full - locked {len(qs.locked_players)} players")
+
+                # Assign match roles immediately so players can be pinged in team selection
+                # Get the next match number (will be used when Series is created)
+                # IMPORTANT: Increment counter immediately to prevent duplicate numbers if another queue fills
+                Series.match_counter += 1
+                next_match_number = Series.match_counter
+                qs.pending_match_number = next_match_number
+                log_action(f"Assigned pending match number: {next_match_number}")
+
+                # Add active match roles to locked players immediately, and remove matched
+                # players from all other queues they might be in - independent, so run together
+                await asyncio.gather(
+                    add_active_match_roles(interaction.guild, qs.locked_players, qs.playlist_name, next_match_number),
+                    remove_players_from_other_queues(interaction.guild, qs.locked_players, current_queue=qs)
+                )
 
-        # Only defer if we haven't already responded (no MMR warning sent)
-        if not response_sent:
-            await interaction.response.defer()
-        await update_queue_embed(interaction.channel, qs)
-
-        # Update ping message if exists (only for primary queue)
-        if qs == queue_state:
-            await update_ping_message(interaction.guild)
-
-        # Start pregame if queue is full
-        if len(qs.queue) == MAX_QUEUE_SIZE:
-            # Lock players immediately - they cannot leave once queue is full
-            qs.locked = True
-            qs.locked_players = qs.queue[:]
-            log_action(f"Queue full - locked {len(qs.locked_players)} players")
-
-            # Assign match roles immediately so players can be pinged in team selection
-            # Get the next match number (will be used when Series is created)
-            # IMPORTANT: Increment counter immediately to prevent duplicate numbers if another queue fills
-            from ingame import Series
-            Series.match_counter += 1
-            next_match_number = Series.match_counter
-            qs.pending_match_number = next_match_number
-            log_action(f"Assigned pending match number: {next_match_number}")
-
-            # Add active match roles to locked players immediately
-            await add_active_match_roles(interaction.guild, qs.locked_players, qs.playlist_name, next_match_number)
-
-            # Remove matched players from all other queues they might be in
-            await remove_players_from_other_queues(interaction.guild, qs.locked_players, current_queue=qs)
-
-            # Clear the queue immediately so new players can join the next queue
-            # The locked_players list holds the 8 matched players
-            qs.queue.clear()
-            qs.queue_join_times.clear()
-            qs.last_activity_times.clear()
-            qs.locked = False  # Queue is no longer locked - only players are locked
-            log_action("Queue cleared - ready for new players")
-
-            # Update queue embed to show empty/available
-            await update_queue_embed(interaction.channel, qs)
+                # Queue was emptied at lock time so new players can join the next queue
+                # The locked_players list holds the 8 matched players
+                qs.locked = False  # Queue is no longer locked - only players are locked
+                log_action("Queue cleared - ready for new players")
 
-            # Save state with locked players before starting pregame
-            try:
-                import state_manager
-                state_manager.save_state()
-                log_action("Saved state with locked players for pregame")
-            except:
-                pass
+                # Update queue embed to show empty/available
+                await update_queue_embed(interaction.channel, qs)
+
+                # Save state with locked players before starting pregame
+                try:
+                    await state_manager.save_state_async()
+                    log_action("Saved state with locked players for pregame")
+                except:
+                    pass
 
-            from pregame import start_pregame
-            await start_pregame(interaction.channel, mlg_queue_state=qs)
+                await start_pregame(interaction.channel, mlg_queue_state=qs)
 
     @discord.ui.button(label="Leave Matchmaking", style=discord.ButtonStyle.danger, custom_id="leave_queue")
     async def leave_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
-        user_id = interaction.user.id
+        # One handler at a time per user - a double-click must not join/leave twice
+        async with user_lock(interaction.user.id):
+            user_id = interaction.user.id
 
-        # Get the correct queue state for this channel
-        qs = get_queue_state(interaction.channel.id)
+            # Get the correct queue state for this channel
+            qs = get_queue_state(interaction.channel.id)
 
-        # Check if user is locked into a match
-        if user_id in qs.locked_players:
-            await interaction.response.send_message("❌ Queue is locked! You cannot leave once the match has started.", ephemeral=True)
-            return
+            # Check if user is locked into a match
+            if user_id in qs.locked_players:
+                await interaction.response.send_message("❌ Queue is locked! You cannot leave once the match has started.", ephemeral=True)
+                return
 
-        if user_id not in qs.queue:
-            await interaction.response.send_message("You're not in matchmaking!", ephemeral=True)
-            return
+            if user_id not in qs.entries:
+                await interaction.response.send_message("You're not in matchmaking!", ephemeral=True)
+                return
 
-        # Calculate time spent in queue
-        time_in_queue = ""
-        if user_id in qs.queue_join_times:
-            join_time = qs.queue_join_times[user_id]
-            elapsed = datetime.now() - join_time
-            total_minutes = int(elapsed.total_seconds() / 60)
-            seconds = int(elapsed.total_seconds() % 60)
-
-            if total_minutes >= 60:
-                hours = total_minutes // 60
-                mins = total_minutes % 60
-                time_in_queue = f"{hours}h {mins}m"
-            elif total_minutes > 0:
-                time_in_queue = f"{total_minutes}m {seconds}s"
-            else:
-                time_in_queue = f"{seconds}s"
-
-            del qs.queue_join_times[user_id]
-        if user_id in qs.last_activity_times:
-            del qs.last_activity_times[user_id]
-
-        qs.queue.remove(user_id)
-        qs.recent_action = {
-            'type': 'leave',
-            'user_id': user_id,
-            'name': interaction.user.display_name,
-            'time_in_queue': time_in_queue
-        }
+            entry = qs.entries.pop(user_id)
+            state_manager.log_queue_leave(qs, user_id)
 
-        queue_name = "Halo 2 Chill Lobby" if qs == queue_state_2 else "MLG 4v4"
-        log_action(f"{interaction.user.display_name} left {queue_name} after {time_in_queue} ({len(qs.queue)}/{MAX_QUEUE_SIZE})")
+            # Calculate time spent in queue
+            time_in_queue = ""
+            if entry.join_time:
+                time_in_queue = _format_elapsed(int((datetime.now() - entry.join_time).total_seconds()))
 
-        # Clean up any pending inactivity confirmation
-        await cleanup_inactivity_messages(user_id, qs)
+            qs.recent_action = {
+                'type': 'leave',
+                'user_id': user_id,
+                'name': interaction.user.display_name,
+                'time_in_queue': time_in_queue
+            }
+            await notify_queue_changed(qs)
 
-        # Remove SearchingMatchmaking role
-        try:
-            searching_role = discord.utils.get(interaction.guild.roles, name="SearchingMatchmaking")
-            if searching_role:
-                await interaction.user.remove_roles(searching_role)
-                log_action(f"Removed SearchingMatchmaking role from {interaction.user.display_name}")
-        except Exception as e:
-            log_action(f"Failed to remove SearchingMatchmaking role: {e}")
+            queue_name = qs.display_name
+            log_action(f"{interaction.user.display_name} left {queue_name} after {time_in_queue} ({len(qs.entries)}/{MAX_QUEUE_SIZE})")
 
-        # Save state
-        try:
-            import state_manager
-            state_manager.save_state()
-        except:
-            pass
+            # Clean up any pending inactivity confirmation
+            await cleanup_inactivity_messages(user_id, qs)
 
-        # Just defer and update - no message shown
-        await interaction.response.defer()
-        await update_queue_embed(interaction.channel, qs)
+            # Remove SearchingMatchmaking role (unless still searching in the other queue)
+            try:
+                searching_role = get_searching_role(interaction.guild)
+                if (searching_role and searching_role in interaction.user.roles
+                        and not is_in_any_queue(user_id)):
+                    await interaction.user.remove_roles(searching_role)
+                    log_action(f"Removed SearchingMatchmaking role from {interaction.user.display_name}")
+            except Exception as e:
+                log_action(f"Failed to remove SearchingMatchmaking role: {e}")
 
-        # Update ping message if exists (only for primary queue)
-        if qs == queue_state:
-            await update_ping_message(interaction.guild)
+            # Just defer and update - no message shown
+            await interaction.response.defer()
+            await update_queue_embed(interaction.channel, qs)
+
+            # Update ping message if exists (only for primary queue)
+            if qs == queue_state:
+                await update_ping_message(interaction.guild)
     
     @discord.ui.button(label="Ping", style=discord.ButtonStyle.secondary, custom_id="ping_queue")
     async def ping_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -882,17 +1055,17 @@ class QueueView(View):
         qs = get_queue_state(interaction.channel.id)
 
         # Ping feature disabled for restricted queue
-        if qs == queue_state_2:
+        if qs.is_restricted:
             await interaction.response.send_message("❌ Ping is not available for this queue.", ephemeral=True)
             return
 
         # Check if queue is empty
-        if len(qs.queue) == 0:
+        if len(qs.entries) == 0:
             await interaction.response.send_message("❌ Queue is empty! Join first before pinging.", ephemeral=True)
             return
 
         # Check if queue is full
-        if len(qs.queue) >= MAX_QUEUE_SIZE:
+        if len(qs.entries) >= MAX_QUEUE_SIZE:
             await interaction.response.send_message("❌ Queue is already full!", ephemeral=True)
             return
 
@@ -931,11 +1104,11 @@ class QueueView(View):
                 pass
 
         # Create embed with progress image (no title, simple description)
-        current_count = len(qs.queue)
+        current_count = len(qs.entries)
         needed = MAX_QUEUE_SIZE - current_count
 
         # Use different name for restricted queue
-        queue_title = "Halo 2 Chill Lobby" if qs == queue_state_2 else "MLG 4v4"
+        queue_title = qs.display_name
         content_embed = discord.Embed(
             description=f"We have **{current_count}** players searching for a match in **{queue_title}**, looking for **{needed}** more for a match!",
             color=discord.Color.green()
@@ -947,205 +1120,204 @@ class QueueView(View):
         # Create view with join button - pass the queue state
         view = PingJoinView(qs)
 
-        # Send @here first, then delete it (pings but disappears)
-        here_msg = await general_channel.send("@here")
-        await asyncio.sleep(0.1)
-        try:
-            await here_msg.delete()
-        except:
-            pass
-
-        # Send embed
-        qs.ping_message = await general_channel.send(embed=content_embed, view=view)
+        # Send @here with the embed in a single message
+        qs.ping_message = await general_channel.send(
+            content="@here",
+            embed=content_embed,
+            view=view,
+            allowed_mentions=discord.AllowedMentions(everyone=True)
+        )
 
-        queue_name = "Halo 2 Chill Lobby" if qs == queue_state_2 else "MLG 4v4"
+        queue_name = qs.display_name
         log_action(f"{interaction.user.display_name} pinged general chat for {queue_name} ({current_count}/{MAX_QUEUE_SIZE})")
 
 
+# Shared QueueView - stateless with persistent custom_ids, so one instance serves every
+# queue embed. Created lazily because discord.py views need a running event loop.
+_QUEUE_VIEW: Optional[QueueView] = None
+
+def get_queue_view() -> QueueView:
+    """Get the shared QueueView instance"""
+    global _QUEUE_VIEW
+    if _QUEUE_VIEW is None:
+        _QUEUE_VIEW = QueueView()
+    return _QUEUE_VIEW
+
+
 class PingJoinView(View):
     """View for the ping message in general chat with join button"""
     def __init__(self, qs=None):
         super().__init__(timeout=None)
         # Store which queue this ping belongs to (default to primary)
-        self.is_restricted = (qs == queue_state_2) if qs else False
+        self.is_restricted = qs.is_restricted if qs else False
 
     @discord.ui.button(label="Join Matchmaking", style=discord.ButtonStyle.success, custom_id="ping_join_queue")
     async def join_from_ping(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Join queue from the ping message"""
-        user_id = interaction.user.id
-        user_roles = [role.name for role in interaction.user.roles]
+        # One handler at a time per user - a double-click must not join/leave twice
+        async with user_lock(interaction.user.id):
+            user_id = interaction.user.id
 
-        # Determine which queue to use based on the view's stored info
-        qs = queue_state_2 if self.is_restricted else queue_state
-
-        # Check if matchmaking is paused
-        if qs.paused:
-            await interaction.response.send_message(
-                "⏸️ **Sorry, Matchmaking is currently paused.**\n\nPlease wait for a staff member to resume it.",
-                ephemeral=True
-            )
-            return
+            # Determine which queue to use based on the view's stored info
+            qs = queue_state_2 if self.is_restricted else queue_state
 
-        # Check if user has banned role for this queue
-        if self.is_restricted and QUEUE_2_BANNED_ROLE:
-            if QUEUE_2_BANNED_ROLE in user_roles:
+            # Check if matchmaking is paused
+            if qs.paused:
                 await interaction.response.send_message(
-                    "❌ **You cannot join this queue.**\n\nPlease use the main MLG 4v4 queue instead.",
+                    "⏸️ **Sorry, Matchmaking is currently paused.**\n\nPlease wait for a staff member to resume it.",
                     ephemeral=True
                 )
                 return
 
-        # Check banned/required roles
-        import json
-        import os
-        if os.path.exists('queue_config.json'):
-            try:
-                with open('queue_config.json', 'r') as f:
-                    config = json.load(f)
-
-                banned = config.get('banned_roles', [])
-                if any(role in banned for role in user_roles):
-                    await interaction.response.send_message("❌ You have a banned role and cannot queue!", ephemeral=True)
+            # Check if user has banned role for this queue
+            if self.is_restricted and QUEUE_2_BANNED_ROLE:
+                queue_2_banned = get_cached_role(interaction.guild, QUEUE_2_BANNED_ROLE)
+                if queue_2_banned and interaction.user.get_role(queue_2_banned.id):
+                    await interaction.response.send_message(
+                        "❌ **You cannot join this queue.**\n\nPlease use the main MLG 4v4 queue instead.",
+                        ephemeral=True
+                    )
                     return
 
-                required = config.get('required_roles', [])
-                if required and not any(role in required for role in user_roles):
-                    await interaction.response.send_message(f"❌ You need one of these roles to queue: {', '.join(required)}", ephemeral=True)
-                    return
-            except:
-                pass
+            # Check banned/required roles
+            config = load_queue_config()
+            banned_ids, required_ids = get_queue_role_ids(interaction.guild, config)
+            user_role_ids = {role.id for role in interaction.user.roles}
 
-        # Check if player has MMR stats
-        import STATSRANKS
-        player_stats = STATSRANKS.get_existing_player_stats(user_id)
-        if not player_stats or 'mmr' not in player_stats:
-            # Tell the player they need MMR
-            await interaction.response.send_message(
-                "❌ **You don't have an MMR rating yet!**\n\n"
-                "You need to be assigned an MMR before you can join matchmaking.\n"
-                "A staff member has been notified to set your MMR.",
-                ephemeral=True
-            )
-            # Send separate alert to general chat for staff (NOT connected to the ping message)
-            GENERAL_CHANNEL_ID = 1403855176460406805
-            general_channel = interaction.guild.get_channel(GENERAL_CHANNEL_ID)
-            if general_channel:
-                embed = discord.Embed(
-                    title="⚠️ New Player Needs MMR",
-                    description=f"{interaction.user.mention} tried to join matchmaking but doesn't have an MMR rating.\n\n"
-                               f"Please use `/mmr` to assign them a starting MMR.",
-                    color=discord.Color.orange()
-                )
-                embed.set_footer(text="Player cannot queue until MMR is set")
-                # Ping @Server Support role by name
-                server_support_role = discord.utils.get(interaction.guild.roles, name="Server Support")
-                role_ping = server_support_role.mention if server_support_role else "@Server Support"
-                await general_channel.send(
-                    content=role_ping,
-                    embed=embed
-                )
-            return
+            # Check banned roles
+            if not user_role_ids.isdisjoint(banned_ids):
+                await interaction.response.send_message("❌ You have a banned role and cannot queue!", ephemeral=True)
+                return
 
-        # Check if already in this queue
-        if user_id in qs.queue:
-            await interaction.response.send_message("You're already in this queue!", ephemeral=True)
-            return
+            # Check required roles
+            required = config.get('required_roles', [])
+            if required and user_role_ids.isdisjoint(required_ids):
+                await interaction.response.send_message(f"❌ You need one of these roles to queue: {', '.join(required)}", ephemeral=True)
+                return
+
+            # Check if player has MMR stats
+            mmr = get_known_mmr(user_id)
+            if mmr is None:
+                # Tell the player they need MMR
+                await interaction.response.send_message(
+                    "❌ **You don't have an MMR rating yet!**\n\n"
+                    "You need to be assigned an MMR before you can join matchmaking.\n"
+                    "A staff member has been notified to set your MMR.",
+                    ephemeral=True
+                )
+                # Send separate alert to general chat for staff (NOT connected to the ping message)
+                GENERAL_CHANNEL_ID = 1403855176460406805
+                general_channel = interaction.guild.get_channel(GENERAL_CHANNEL_ID)
+                if general_channel:
+                    embed = discord.Embed(
+                        title="⚠️ New Player Needs MMR",
+                        description=f"{interaction.user.mention} tried to join matchmaking but doesn't have an MMR rating.\n\n"
+                                   f"Please use `/mmr` to assign them a starting MMR.",
+                        color=discord.Color.orange()
+                    )
+                    embed.set_footer(text="Player cannot queue until MMR is set")
+                    # Ping @Server Support role by name
+                    server_support_role = get_cached_role(interaction.guild, "Server Support")
+                    role_ping = server_support_role.mention if server_support_role else "@Server Support"
+                    await general_channel.send(
+                        content=role_ping,
+                        embed=embed
+                    )
+                return
 
-        # Allow joining multiple queues - no blocking checks
-        # Players will be removed from other queues when they get matched
+            # Check if already in this queue
+            if user_id in qs.entries:
+                await interaction.response.send_message("You're already in this queue!", ephemeral=True)
+                return
 
-        # Check if queue is full
-        if len(qs.queue) >= MAX_QUEUE_SIZE:
-            await interaction.response.send_message("Matchmaking is full!", ephemeral=True)
-            return
+            # Allow joining multiple queues - no blocking checks
+            # Players will be removed from other queues when they get matched
 
-        # Check if player is in the current match (can't queue while playing)
-        if qs.current_series:
-            if user_id in qs.current_series.red_team or user_id in qs.current_series.blue_team:
-                await interaction.response.send_message("You're in the current match! Finish it first.", ephemeral=True)
+            # Check if queue is full
+            if len(qs.entries) >= MAX_QUEUE_SIZE:
+                await interaction.response.send_message("Matchmaking is full!", ephemeral=True)
                 return
 
-        # Add to queue
-        qs.queue.append(user_id)
-        qs.queue_join_times[user_id] = datetime.now()
-        qs.last_activity_times[user_id] = datetime.now()  # For inactivity check
+            # Check if player is in the current match (can't queue while playing)
+            if qs.current_series:
+                if user_id in qs.current_series.red_team or user_id in qs.current_series.blue_team:
+                    await interaction.response.send_message("You're in the current match! Finish it first.", ephemeral=True)
+                    return
 
-        # Clear recent action if this user was the one who left (they're rejoining)
-        if qs.recent_action and qs.recent_action.get('user_id') == user_id:
-            qs.recent_action = None
+            # Add to queue
+            now = datetime.now()
+            qs.entries[user_id] = QueueEntry(join_time=now, last_activity=now)
+            state_manager.log_queue_join(qs, user_id)  # Logged before any await so it can't land after a fill
+            _display_name_cache[user_id] = interaction.user.display_name
+            await notify_queue_changed(qs)
 
-        queue_name = "Halo 2 Chill Lobby" if qs == queue_state_2 else "MLG 4v4"
-        log_action(f"{interaction.user.display_name} joined {queue_name} from ping ({len(qs.queue)}/{MAX_QUEUE_SIZE}) - MMR: {player_stats['mmr']}")
+            # Clear recent action if this user was the one who left (they're rejoining)
+            if qs.recent_action and qs.recent_action.get('user_id') == user_id:
+                qs.recent_action = None
 
-        # Add SearchingMatchmaking role
-        try:
-            searching_role = discord.utils.get(interaction.guild.roles, name="SearchingMatchmaking")
-            if searching_role:
-                await interaction.user.add_roles(searching_role)
-                log_action(f"Added SearchingMatchmaking role to {interaction.user.display_name}")
-        except Exception as e:
-            log_action(f"Failed to add SearchingMatchmaking role: {e}")
+            queue_name = qs.display_name
+            log_action(f"{interaction.user.display_name} joined {queue_name} from ping ({len(qs.entries)}/{MAX_QUEUE_SIZE}) - MMR: {mmr}")
 
-        # Save state
-        try:
-            import state_manager
-            state_manager.save_state()
-        except:
-            pass
+            # Add SearchingMatchmaking role
+            try:
+                searching_role = get_searching_role(interaction.guild)
+                if searching_role and searching_role not in interaction.user.roles:
+                    await interaction.user.add_roles(searching_role)
+                    log_action(f"Added SearchingMatchmaking role to {interaction.user.display_name}")
+            except Exception as e:
+                log_action(f"Failed to add SearchingMatchmaking role: {e}")
 
-        await interaction.response.defer()
+            await interaction.response.defer()
 
-        # Update queue embed in queue channel
-        if qs.queue_channel:
-            await update_queue_embed(qs.queue_channel, qs)
-
-        # Update or delete ping message (only for primary queue for now)
-        if qs == queue_state:
-            await update_ping_message(interaction.guild)
-
-        # Start pregame if queue is full
-        if len(qs.queue) >= MAX_QUEUE_SIZE:
-            # Lock players immediately - they cannot leave once queue is full
-            qs.locked = True
-            qs.locked_players = qs.queue[:]
-            log_action(f"Queue full - locked {len(qs.locked_players)} players")
-
-            # Assign match roles immediately so players can be pinged in team selection
-            # Get the next match number (will be used when Series is created)
-            # IMPORTANT: Increment counter immediately to prevent duplicate numbers if another queue fills
-            from ingame import Series
-            Series.match_counter += 1
-            next_match_number = Series.match_counter
-            qs.pending_match_number = next_match_number
-            log_action(f"Assigned pending match number: {next_match_number}")
-
-            # Add active match roles to locked players immediately
-            await add_active_match_roles(interaction.guild, qs.locked_players, qs.playlist_name, next_match_number)
-
-            # Remove matched players from all other queues they might be in
-            await remove_players_from_other_queues(interaction.guild, qs.locked_players, current_queue=qs)
-
-            # Clear the queue immediately so new players can join the next queue
-            qs.queue.clear()
-            qs.queue_join_times.clear()
-            qs.last_activity_times.clear()
-            qs.locked = False
-            log_action("Queue cleared - ready for new players")
-
-            # Update queue embed to show empty/available
-            if qs.queue_channel:
+            # Update queue embed in queue channel - a filling join repaints it once, after the queue is cleared below
+            if qs.queue_channel and len(qs.entries) < MAX_QUEUE_SIZE:
                 await update_queue_embed(qs.queue_channel, qs)
 
-                # Save state with locked players before starting pregame
-                try:
-                    import state_manager
-                    state_manager.save_state()
-                    log_action("Saved state with locked players for pregame")
-                except:
-                    pass
+            # Update or delete ping message (only for primary queue for now)
+            if qs == queue_state:
+                await update_ping_message(interaction.guild)
+
+            # Start pregame if queue is full
+            if len(qs.entries) >= MAX_QUEUE_SIZE:
+                # Lock players immediately - they cannot leave once queue is full
+                qs.locked = True
+                # Hand the players over to locked_players and start a fresh queue in one step,
+                # so nobody who joins while match roles are assigned gets wiped with them
+                qs.locked_players = list(qs.entries)
+                qs.entries = {}
+                log_action(f"Queue full - locked {len(qs.locked_players)} players")
+
+                # Assign match roles immediately so players can be pinged in team selection
+                # Get the next match number (will be used when Series is created)
+                # IMPORTANT: Increment counter immediately to prevent duplicate numbers if another queue fills
+                Series.match_counter += 1
+                next_match_number = Series.match_counter
+                qs.pending_match_number = next_match_number
+                log_action(f"Assigned pending match number: {next_match_number}")
+
+                # Add active match roles to locked players immediately, and remove matched
+                # players from all other queues they might be in - independent, so run together
+                await asyncio.gather(
+                    add_active_match_roles(interaction.guild, qs.locked_players, qs.playlist_name, next_match_number),
+                    remove_players_from_other_queues(interaction.guild, qs.locked_players, current_queue=qs)
+                )
+
+                # Queue was emptied at lock time so new players can join the next queue
+                qs.locked = False
+                log_action("Queue cleared - ready for new players")
+
+                # Update queue embed to show empty/available
+                if qs.queue_channel:
+                    await update_queue_embed(qs.queue_channel, qs)
 
-                from pregame import start_pregame
-                await start_pregame(qs.queue_channel, mlg_queue_state=qs)
+                    # Save state with locked players before starting pregame
+                    try:
+                        await state_manager.save_state_async()
+                        log_action("Saved state with locked players for pregame")
+                    except:
+                        pass
+
+                    await start_pregame(qs.queue_channel, mlg_queue_state=qs)
 
 
 async def update_ping_message(guild: discord.Guild):
@@ -1153,7 +1325,7 @@ async def update_ping_message(guild: discord.Guild):
     if not queue_state.ping_message:
         return
     
-    current_count = len(queue_state.queue)
+    current_count = len(queue_state.entries)
     
     # Delete if queue is full
     if current_count >= MAX_QUEUE_SIZE:
@@ -1203,6 +1375,61 @@ async def delete_ping_message():
             pass
 
 
+async def show_queue_message(channel: discord.TextChannel, qs, embed: discord.Embed, view: View):
+    """Edit the queue embed in place if it's the newest message, otherwise repost it at the bottom
+
+    Uses the stored message ID and the channel's cached last_message_id, so the common
+    case is a single edit request with no history fetch.
+    """
+    if qs.queue_message_id:
+        if channel.last_message_id is not None:
+            is_at_bottom = (channel.last_message_id == qs.queue_message_id)
+        else:
+            # Channel's last message unknown (e.g. just after startup) - ask Discord once
+            is_at_bottom = False
+            async for most_recent in channel.history(limit=1):
+                is_at_bottom = (most_recent.id == qs.queue_message_id)
+
+        queue_message = channel.get_partial_message(qs.queue_message_id)
+        if is_at_bottom:
+            # At bottom - edit in place (fast path)
+            try:
+                qs.queue_message = await queue_message.edit(embed=embed, view=view)
+                return
+            except discord.NotFound:
+                pass  # Message was deleted - post a new one
+            except discord.HTTPException as e:
+                # Old embed is still there - skip this refresh rather than post a second panel
+                log_action(f"Queue embed edit failed, skipping refresh: {e}")
+                return
+        else:
+            # Not at bottom - delete and repost to move to bottom
+            try:
+                await queue_message.delete()
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                log_action(f"Queue embed delete failed, skipping refresh: {e}")
+                return
+        qs.queue_message = None
+        qs.queue_message_id = None
+    else:
+        # No known embed (cold start) - remove a leftover queue embed from a previous run
+        async for message in channel.history(limit=50):
+            if message.author.bot and message.embeds:
+                emb = message.embeds[0]
+                if emb.title and ("Matchmaking" in emb.title or "Chill Lobby" in emb.title):
+                    try:
+                        await message.delete()
+                    except discord.HTTPException:
+                        pass
+                    break
+
+    # Post new message at bottom
+    new_message = await channel.send(embed=embed, view=view)
+    qs.queue_message = new_message
+    qs.queue_message_id = new_message.id
+
 async def create_queue_embed(channel: discord.TextChannel, qs=None):
     """Create initial queue embed"""
     # Determine which queue state to use
@@ -1212,16 +1439,7 @@ async def create_queue_embed(channel: discord.TextChannel, qs=None):
     # Store channel for auto-updates
     qs.queue_channel = channel
 
-    # Determine title based on queue type
-    is_restricted = (qs == queue_state_2)
-    title = "Halo 2 Chill Lobby" if is_restricted else "MLG 4v4 Matchmaking"
-    description = "*Classic 4v4 with team selection vote*"
-
-    embed = discord.Embed(
-        title=title,
-        description=description,
-        color=discord.Color.blue()
-    )
+    embed = discord.Embed(title=qs.title, description=qs.base_desc, color=discord.Color.blue())
     embed.add_field(
         name=f"Players in Queue (0/{MAX_QUEUE_SIZE})",
         value="*No players yet*",
@@ -1229,142 +1447,86 @@ async def create_queue_embed(channel: discord.TextChannel, qs=None):
     )
     # No progress image for empty queue
 
-    view = QueueView()
-
-    # Try to use cached message reference first (much faster than history search)
-    queue_message = getattr(qs, 'queue_message', None)
-
-    # Always check if cached message is at the bottom before editing
-    # This ensures queue embed stays at bottom even after game results are posted
-    if queue_message:
-        try:
-            # Quick check: get the most recent message to see if queue embed is at bottom
-            is_at_bottom = False
-            async for most_recent in channel.history(limit=1):
-                is_at_bottom = (most_recent.id == queue_message.id)
-                break
-
-            if is_at_bottom:
-                # At bottom - edit in place (fast path)
-                await queue_message.edit(embed=embed, view=view)
-                # Start auto-update task if not already running
-                if qs.auto_update_task is None or qs.auto_update_task.done():
-                    qs.auto_update_task = asyncio.create_task(auto_update_queue_times(qs))
-                    queue_name = "Halo 2 Chill Lobby" if is_restricted else "MLG 4v4"
-                    log_action(f"Started {queue_name} queue auto-update task")
-                return
-            else:
-                # Not at bottom - delete and repost to move to bottom
-                try:
-                    await queue_message.delete()
-                except:
-                    pass
-                qs.queue_message = None
-                queue_message = None
-        except:
-            # Message was deleted or invalid - clear cache
-            qs.queue_message = None
-            queue_message = None
-
-    # Search history to find queue embed if not cached
-    if not queue_message:
-        async for message in channel.history(limit=50):
-            if message.author.bot and message.embeds:
-                for emb in message.embeds:
-                    if emb.title and ("Matchmaking" in emb.title or "Chill Lobby" in emb.title):
-                        queue_message = message
-                        # Found it - delete since it's not at bottom (we already checked cached)
-                        try:
-                            await queue_message.delete()
-                        except:
-                            pass
-                        break
-            if queue_message:
-                break
-
-    # Post new message at bottom
-    new_message = await channel.send(embed=embed, view=view)
-    qs.queue_message = new_message  # Cache the new message
+    view = get_queue_view()
+    await show_queue_message(channel, qs, embed, view)
 
     # Start auto-update task if not already running
     if qs.auto_update_task is None or qs.auto_update_task.done():
         qs.auto_update_task = asyncio.create_task(auto_update_queue_times(qs))
-        queue_name = "Halo 2 Chill Lobby" if is_restricted else "MLG 4v4"
+        queue_name = qs.display_name
         log_action(f"Started {queue_name} queue auto-update task")
 
 async def update_queue_embed(channel: discord.TextChannel, qs=None):
-    """Update the queue embed"""
+    """Schedule a queue embed refresh - calls in quick succession are coalesced into one edit"""
     # Determine which queue state to use
     if qs is None:
         qs = get_queue_state(channel.id)
 
-    is_restricted = (qs == queue_state_2)
+    qs.embed_dirty = True
+    qs.embed_channel = channel
+    if qs.embed_flush_task is None or qs.embed_flush_task.done():
+        qs.embed_flush_task = asyncio.create_task(flush_queue_embed(qs))
+
+async def flush_queue_embed(qs):
+    """Wait out the debounce window, then apply all pending embed refreshes as one edit"""
+    await asyncio.sleep(QUEUE_EMBED_DEBOUNCE_SECONDS)
+    # Loop in case another refresh was requested while the edit was in flight
+    while qs.embed_dirty:
+        qs.embed_dirty = False
+        try:
+            await _do_update_queue_embed(qs.embed_channel, qs)
+        except Exception as e:
+            log_action(f"Failed to update queue embed: {e}")
+
+def _format_queue_entry(guild: discord.Guild, qs, uid: int, entry: QueueEntry, now: datetime) -> str:
+    """Format one queue embed line: bold name plus time in queue"""
+    # Check if we should hide names
+    if qs.hide_player_names:
+        display_name = "Matched Player"
+    elif uid in qs.guests:
+        # This is a guest - use their custom name
+        display_name = qs.guests[uid]["name"]
+    else:
+        display_name = get_display_name(guild, uid)
+
+    join_time = entry.join_time
+    if not join_time:
+        return f"**{display_name}**"
+
+    # No seconds after the first minute - keeps the list steady between refreshes
+    time_str = _format_elapsed(int((now - join_time).total_seconds()), with_seconds=False)
+    return f"**{display_name}** - {time_str}"
 
+async def _do_update_queue_embed(channel: discord.TextChannel, qs):
+    """Rebuild the queue embed and edit it in place"""
     # Build player list with join times
-    if qs.queue:
-        player_list = []
+    if qs.entries:
         now = datetime.now()
         guild = channel.guild
-        for uid in qs.queue:
-            # Check if we should hide names
-            if qs.hide_player_names:
-                display_name = "Matched Player"
-            elif uid in qs.guests:
-                # This is a guest - use their custom name
-                display_name = qs.guests[uid]["name"]
-            else:
-                # Get member to ensure we have their display name
-                member = guild.get_member(uid)
-                if member:
-                    display_name = member.display_name
-                else:
-                    # Fallback to mention if member not in cache
-                    display_name = f"<@{uid}>"
-
-            join_time = qs.queue_join_times.get(uid)
-            if join_time:
-                elapsed = now - join_time
-                total_seconds = int(elapsed.total_seconds())
-                total_minutes = total_seconds // 60
-                seconds = total_seconds % 60
-
-                if total_minutes >= 60:
-                    # Show hours and minutes only
-                    hours = total_minutes // 60
-                    mins = total_minutes % 60
-                    time_str = f"{hours}h {mins}m"
-                elif total_minutes > 0:
-                    # Show minutes only (no seconds after 1 minute)
-                    time_str = f"{total_minutes}m"
-                else:
-                    # Show seconds only for first minute
-                    time_str = f"{seconds}s"
-                player_list.append(f"**{display_name}** - {time_str}")
-            else:
-                player_list.append(f"**{display_name}**")
-        player_mentions = "\n".join(player_list)
+        player_mentions = "\n".join(
+            _format_queue_entry(guild, qs, uid, entry, now) for uid, entry in qs.entries.items()
+        )
     else:
         player_mentions = "*No players yet*"
 
-    # Create embed
-    player_count = len(qs.queue)
-
-    # Build description
-    desc = "*Classic 4v4 with team selection vote*"
-
-    title = "Halo 2 Chill Lobby" if is_restricted else "MLG 4v4 Matchmaking"
-    embed = discord.Embed(
-        title=title,
-        description=desc,
-        color=discord.Color.blue()
-    )
-    embed.add_field(
+    # Reuse the embed from the last refresh - only the dynamic parts change
+    player_count = len(qs.entries)
+    embed = qs.embed
+    if embed is None:
+        embed = discord.Embed(title=qs.title, description=qs.base_desc, color=discord.Color.blue())
+        embed.add_field(name="Players in Queue", value="", inline=False)
+        qs.embed = embed
+        qs.embed_image_count = 0
+
+    embed.set_field_at(
+        0,
         name=f"Players in Queue ({player_count}/{MAX_QUEUE_SIZE})",
         value=player_mentions,
         inline=False
     )
 
     # Add recent action - only show leaves (not joins)
+    recent_activity = None
     if qs.recent_action:
         action = qs.recent_action
         if action['type'] == 'leave':
@@ -1373,71 +1535,25 @@ async def update_queue_embed(channel: discord.TextChannel, qs=None):
             # Show AFK annotation if kicked for inactivity
             afk_tag = " - AFK" if reason and "inactivity" in reason.lower() else ""
             if time_str:
-                embed.add_field(
-                    name="Recent Activity",
-                    value=f"**{action['name']}** left matchmaking ({time_str}{afk_tag})",
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="Recent Activity",
-                    value=f"**{action['name']}** left matchmaking",
-                    inline=False
-                )
-
-    # Progress image at the bottom (only if players in queue)
-    progress_image = get_queue_progress_image(player_count)
-    if progress_image:
-        embed.set_image(url=progress_image)
-
-    view = QueueView()
-
-    # Try to use cached message reference first (much faster than history search)
-    queue_message = getattr(qs, 'queue_message', None)
-
-    # Always check if cached message is at the bottom before editing
-    # This ensures queue embed stays at bottom even after game results are posted
-    if queue_message:
-        try:
-            # Quick check: get the most recent message to see if queue embed is at bottom
-            is_at_bottom = False
-            async for most_recent in channel.history(limit=1):
-                is_at_bottom = (most_recent.id == queue_message.id)
-                break
-
-            if is_at_bottom:
-                # At bottom - edit in place (fast path)
-                await queue_message.edit(embed=embed, view=view)
-                return
+                recent_activity = f"**{action['name']}** left matchmaking ({time_str}{afk_tag})"
             else:
-                # Not at bottom - delete and repost to move to bottom
-                try:
-                    await queue_message.delete()
-                except:
-                    pass
-                qs.queue_message = None
-                queue_message = None
-        except:
-            # Message was deleted or invalid - clear cache
-            qs.queue_message = None
-            queue_message = None
+                recent_activity = f"**{action['name']}** left matchmaking"
+    if recent_activity:
+        if len(embed.fields) > 1:
+            embed.set_field_at(1, name="Recent Activity", value=recent_activity, inline=False)
+        else:
+            embed.add_field(name="Recent Activity", value=recent_activity, inline=False)
+    elif len(embed.fields) > 1:
+        embed.remove_field(1)
 
-    # Search history to find queue embed if not cached
-    if not queue_message:
-        async for message in channel.history(limit=50):
-            if message.author.bot and message.embeds:
-                for emb in message.embeds:
-                    if emb.title and ("Matchmaking" in emb.title or "Chill Lobby" in emb.title):
-                        queue_message = message
-                        # Found it - delete since it's not at bottom (we already checked cached)
-                        try:
-                            await queue_message.delete()
-                        except:
-                            pass
-                        break
-            if queue_message:
-                break
+    # Progress image at the bottom (only if players in queue) - only touched when the count changes
+    if player_count != qs.embed_image_count:
+        progress_image = get_queue_progress_image(player_count)
+        if progress_image:
+            embed.set_image(url=progress_image)
+        else:
+            embed.set_image(url=None)
+        qs.embed_image_count = player_count
 
-    # Post new message at bottom
-    new_message = await channel.send(embed=embed, view=view)
-    qs.queue_message = new_message  # Cache the new message
+    view = get_queue_view()
+    await show_queue_message(channel, qs, embed, view)
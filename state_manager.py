@@ -3,14 +3,36 @@ state_manager.py - Matchmaking State Persistence
 Saves and restores queue/match state across bot restarts
 """
 
-MODULE_VERSION = "1.5.0"
+MODULE_VERSION = "1.8.6"
 
-import json
+import asyncio
 import os
+import threading
+import json_io
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
 STATE_FILE = 'matchmakingstate.json'
+STATE_TMP_FILE = STATE_FILE + '.tmp'  # Written first, then renamed over STATE_FILE
+
+# Snapshot ordering - a write is skipped if a newer snapshot already reached disk
+_write_lock = threading.Lock()
+_snapshot_seq = 0
+_written_seq = 0
+
+# Coalesced saves: request_save() marks state dirty, _save_worker() writes it
+SAVE_DEBOUNCE_SECONDS = 0.2  # Let a burst of changes settle before snapshotting
+SAVE_COALESCE_SECONDS = 1.0
+_save_event: Optional[asyncio.Event] = None
+_save_task: Optional[asyncio.Task] = None
+
+# Queue joins/leaves are appended here as one JSON line each instead of rewriting
+# STATE_FILE. Each line carries the version of the snapshot it applies on top of;
+# restore_state() replays lines >= the snapshot's version, older lines are compacted away.
+DELTA_FILE = 'matchmakingstate.log'
+SNAPSHOT_EVERY_DELTAS = 50  # Request a full snapshot after this many deltas
+_delta_lock = threading.Lock()
+_delta_count = 0
 
 # EST timezone
 EST = timezone(timedelta(hours=-5))
@@ -20,22 +42,58 @@ def log_state(message: str):
     timestamp = datetime.now(EST).strftime('%Y-%m-%d %H:%M:%S EST')
     print(f"[STATE] [{timestamp}] {message}")
 
+def _entry_times(entries: dict) -> tuple:
+    """Collect QueueEntry timestamps as ({uid_str: join isoformat}, {uid_str: last activity isoformat}),
+    converting each uid to a string once"""
+    join_times = {}
+    activity_times = {}
+    for uid, entry in entries.items():
+        uid_str = str(uid)
+        if entry.join_time is not None:
+            join_times[uid_str] = entry.join_time.isoformat()
+        if entry.last_activity is not None:
+            activity_times[uid_str] = entry.last_activity.isoformat()
+    return join_times, activity_times
+
+def _restore_entries(queue: list, join_times: dict, activity_times: dict) -> dict:
+    """Rebuild a QueueState.entries dict from the saved queue list and timestamp maps"""
+    from searchmatchmaking import QueueEntry
+
+    entries = {}
+    for uid in queue:
+        uid_str = str(uid)
+        join_time = join_times.get(uid_str)
+        last_activity = activity_times.get(uid_str)
+        entries[uid] = QueueEntry(
+            join_time=datetime.fromisoformat(join_time) if join_time else None,
+            last_activity=datetime.fromisoformat(last_activity) if last_activity else None
+        )
+    return entries
+
 def save_state():
     """Save current matchmaking state to JSON"""
-    from searchmatchmaking import queue_state, queue_state_2
+    _write_state_file(*_serialize_state())
+
+async def save_state_async():
+    """Save current matchmaking state without blocking the event loop
+    (snapshot is taken on the loop, the file write runs in a thread)"""
+    await asyncio.to_thread(_write_state_file, *_serialize_state())
 
+def _serialize_state() -> tuple:
+    """Snapshot current matchmaking state as (JSON bytes, log summary, sequence number)"""
+    global _snapshot_seq
+    from searchmatchmaking import queue_state, queue_state_2, get_match_index
+
+    _snapshot_seq += 1
+    join_times, activity_times = _entry_times(queue_state.entries)
+    join_times_2, activity_times_2 = _entry_times(queue_state_2.entries)
     state = {
         "saved_at": datetime.now().isoformat(),
+        "version": _snapshot_seq,
         # Main queue (queue_state)
-        "queue": queue_state.queue,
-        "queue_join_times": {
-            str(uid): time.isoformat()
-            for uid, time in queue_state.queue_join_times.items()
-        },
-        "last_activity_times": {
-            str(uid): time.isoformat()
-            for uid, time in queue_state.last_activity_times.items()
-        },
+        "queue": list(queue_state.entries),
+        "queue_join_times": join_times,
+        "last_activity_times": activity_times,
         "test_mode": queue_state.test_mode,
         "test_team": queue_state.test_team,
         "current_series": None,
@@ -47,15 +105,9 @@ def save_state():
         "locked": getattr(queue_state, 'locked', False),
         "testers": getattr(queue_state, 'testers', []),
         # Queue 2 (queue_state_2)
-        "queue_2": queue_state_2.queue,
-        "queue_2_join_times": {
-            str(uid): time.isoformat()
-            for uid, time in queue_state_2.queue_join_times.items()
-        },
-        "queue_2_last_activity_times": {
-            str(uid): time.isoformat()
-            for uid, time in queue_state_2.last_activity_times.items()
-        },
+        "queue_2": list(queue_state_2.entries),
+        "queue_2_join_times": join_times_2,
+        "queue_2_last_activity_times": activity_times_2,
         "queue_2_test_mode": queue_state_2.test_mode,
         "queue_2_current_series": None,
         # Pregame state for queue 2
@@ -64,7 +116,9 @@ def save_state():
         "queue_2_locked_players": getattr(queue_state_2, 'locked_players', []),
         "queue_2_pending_match_number": getattr(queue_state_2, 'pending_match_number', None),
         "queue_2_locked": getattr(queue_state_2, 'locked', False),
-        "queue_2_testers": getattr(queue_state_2, 'testers', [])
+        "queue_2_testers": getattr(queue_state_2, 'testers', []),
+        # Which match each locked-in player belongs to
+        "match_index": get_match_index()
     }
     
     # Save series state if active
@@ -135,54 +189,247 @@ def save_state():
         pass
 
     has_pregame = state.get("pregame_vc_id") or state.get("locked_players") or state.get("queue_2_pregame_vc_id") or state.get("queue_2_locked_players")
+    summary = f"Queue 1: {len(queue_state.entries)}, Queue 2: {len(queue_state_2.entries)}, Series: {'Active' if queue_state.current_series else 'None'}, Pregame: {has_pregame}"
+
+    # State files are only read by the bot, so no indentation
+    return json_io.dumps(state, indent=False), summary, _snapshot_seq
+
+def _write_state_file(data: bytes, summary: str, seq: int):
+    """Write serialized state to disk atomically (temp file + rename), so a crash
+    mid-write never leaves a truncated STATE_FILE behind"""
+    global _written_seq
+    with _write_lock:
+        if seq <= _written_seq:
+            return  # A newer snapshot was already written
+        try:
+            with open(STATE_TMP_FILE, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(STATE_TMP_FILE, STATE_FILE)
+            _written_seq = seq
+            log_state(f"State saved - {summary}")
+        except Exception as e:
+            log_state(f"Failed to save state: {e}")
+            return
+    _compact_delta_log(seq)
+
+def append_delta(op: str, payload: dict):
+    """Append one state change to DELTA_FILE (O(delta) instead of a full rewrite).
+    A full snapshot is requested every SNAPSHOT_EVERY_DELTAS changes to keep the log short."""
+    global _delta_count
+    line = json_io.dumps({"v": _snapshot_seq, "op": op, **payload}, indent=False) + b"\n"
+    try:
+        with _delta_lock:
+            fd = os.open(DELTA_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except Exception as e:
+        log_state(f"Failed to append state delta: {e}")
+        request_save()
+        return
+
+    _delta_count += 1
+    if _delta_count >= SNAPSHOT_EVERY_DELTAS:
+        _delta_count = 0
+        request_save()
+
+def _queue_number(qs) -> int:
+    """Which queue a QueueState is in the delta log (1 = main, 2 = restricted)"""
+    return 2 if qs.is_restricted else 1
+
+def log_queue_join(qs, user_id: int):
+    """Record a player joining a queue"""
+    entry = qs.entries.get(user_id)
+    append_delta("queue_add", {
+        "queue": _queue_number(qs),
+        "uid": user_id,
+        "join_time": entry.join_time.isoformat() if entry and entry.join_time else None,
+        "last_activity": entry.last_activity.isoformat() if entry and entry.last_activity else None
+    })
+
+def log_queue_leave(qs, user_id: int):
+    """Record a player leaving a queue"""
+    append_delta("queue_remove", {"queue": _queue_number(qs), "uid": user_id})
+
+def _read_deltas(min_version: int) -> list:
+    """Read delta records at or after min_version (a torn last line is ignored)"""
+    if not os.path.exists(DELTA_FILE):
+        return []
+    deltas = []
+    with open(DELTA_FILE, 'rb') as f:
+        for line in f:
+            try:
+                delta = json_io.loads(line)
+            except ValueError:
+                continue
+            if delta.get("v", 0) >= min_version:
+                deltas.append(delta)
+    return deltas
 
+def _compact_delta_log(version: int):
+    """Drop deltas already contained in the snapshot that was just written"""
+    global _delta_count
     try:
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f, indent=2)
-        log_state(f"State saved - Queue 1: {len(queue_state.queue)}, Queue 2: {len(queue_state_2.queue)}, Series: {'Active' if queue_state.current_series else 'None'}, Pregame: {has_pregame}")
+        with _delta_lock:
+            remaining = _read_deltas(version)
+            if remaining:
+                with open(DELTA_FILE + '.tmp', 'wb') as f:
+                    f.writelines(json_io.dumps(d, indent=False) + b"\n" for d in remaining)
+                os.replace(DELTA_FILE + '.tmp', DELTA_FILE)
+            elif os.path.exists(DELTA_FILE):
+                os.remove(DELTA_FILE)
+            _delta_count = len(remaining)
     except Exception as e:
-        log_state(f"Failed to save state: {e}")
+        log_state(f"Failed to compact state log: {e}")
+
+def apply_delta(delta: dict, queue_state, queue_state_2) -> bool:
+    """Apply one delta record to the restored queues"""
+    from searchmatchmaking import QueueEntry
+
+    qs = queue_state_2 if delta.get("queue") == 2 else queue_state
+    uid = delta.get("uid")
+    if delta.get("op") == "queue_add":
+        join_time = delta.get("join_time")
+        last_activity = delta.get("last_activity")
+        qs.entries[uid] = QueueEntry(
+            join_time=datetime.fromisoformat(join_time) if join_time else None,
+            last_activity=datetime.fromisoformat(last_activity) if last_activity else None
+        )
+        return True
+    if delta.get("op") == "queue_remove":
+        qs.entries.pop(uid, None)
+        return True
+    return False
+
+def request_save():
+    """Mark state dirty so the background saver writes it shortly.
+    Falls back to an immediate save if the saver isn't running."""
+    if _save_event is None or _save_task is None or _save_task.done():
+        try:
+            save_state()
+        except Exception as e:
+            log_state(f"Failed to save state: {e}")
+        return
+    _save_event.set()
+
+async def _save_worker():
+    """Write state whenever it's marked dirty, at most once per SAVE_COALESCE_SECONDS"""
+    while True:
+        try:
+            await _save_event.wait()
+            await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+            _save_event.clear()
+            # Snapshot on the event loop, write the file off it
+            await asyncio.to_thread(_write_state_file, *_serialize_state())
+            await asyncio.sleep(SAVE_COALESCE_SECONDS)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            log_state(f"Error in state saver: {e}")
+            await asyncio.sleep(SAVE_COALESCE_SECONDS)
+
+def start_save_worker():
+    """Start the background state saver (call once the event loop is running)"""
+    global _save_event, _save_task
+    if _save_task is None or _save_task.done():
+        _save_event = asyncio.Event()
+        _save_task = asyncio.create_task(_save_worker())
+
+def flush_pending_save():
+    """Synchronously write any save still waiting on the background saver, or a fresh
+    snapshot if deltas were logged since the last one (shutdown)"""
+    pending = _save_event is not None and _save_event.is_set()
+    if pending:
+        _save_event.clear()
+    if pending or _delta_count:
+        save_state()
 
 def load_state() -> Optional[dict]:
     """Load saved state from JSON"""
+    global _snapshot_seq, _written_seq
+    if os.path.exists(STATE_TMP_FILE):
+        # Left over from a save interrupted before its rename - STATE_FILE is still the last good copy
+        log_state("Discarding unfinished state write")
+        try:
+            os.remove(STATE_TMP_FILE)
+        except OSError:
+            pass
+
     if not os.path.exists(STATE_FILE):
         log_state("No saved state found")
         return None
     
     try:
-        with open(STATE_FILE, 'r') as f:
-            state = json.load(f)
+        with open(STATE_FILE, 'rb') as f:
+            state = json_io.loads(f.read())
+        # Continue numbering from the snapshot so new deltas replay on top of it
+        _snapshot_seq = _written_seq = state.get("version", 0)
         log_state(f"State loaded from {state.get('saved_at', 'unknown')}")
         return state
     except Exception as e:
         log_state(f"Failed to load state: {e}")
         return None
 
+async def _recover_series_messages(guild, series, series_data: dict, label: str):
+    """Re-attach a restored series to its Discord messages and refresh the general chat embed.
+    The series message fetch and the general chat update are independent round trips,
+    so they run concurrently."""
+    from ingame import update_general_chat_embed, GENERAL_CHANNEL_ID
+
+    # General chat embed - a partial message can be edited without fetching it first;
+    # if it was deleted the edit fails and update_general_chat_embed searches history
+    general_msg_id = series_data.get("general_message_id")
+    general_channel = guild.get_channel(GENERAL_CHANNEL_ID)
+    if general_msg_id and general_channel:
+        series.general_message = general_channel.get_partial_message(general_msg_id)
+
+    async def recover_series_message():
+        msg_channel_id = series_data.get("series_message_channel_id")
+        msg_id = series_data.get("series_message_id")
+        if msg_channel_id and msg_id:
+            try:
+                channel = guild.get_channel(msg_channel_id)
+                if channel:
+                    series.series_message = await channel.fetch_message(msg_id)
+                    log_state(f"Recovered {label} series message reference")
+            except:
+                log_state(f"Could not recover {label} series message - will create new one")
+
+    async def refresh_general_chat():
+        try:
+            await update_general_chat_embed(guild, series)
+            log_state(f"Updated general chat embed for {label} series")
+        except Exception as e:
+            log_state(f"Failed to update general chat for {label}: {e}")
+
+    await asyncio.gather(recover_series_message(), refresh_general_chat(), return_exceptions=True)
+
 async def restore_state(bot) -> bool:
     """Restore matchmaking state after bot restart"""
-    from searchmatchmaking import queue_state, queue_state_2
-    from ingame import Series, SeriesView, update_general_chat_embed, GENERAL_CHANNEL_ID
+    from searchmatchmaking import queue_state, queue_state_2, notify_queue_changed, restore_match_index
+    from ingame import Series, SeriesView
 
     state = load_state()
     if not state:
         return False
 
+    guild = bot.guilds[0] if bot.guilds else None
+    recoveries = []  # Discord message recovery per series - run together at the end
+
     try:
         # Restore main queue (queue_state)
-        queue_state.queue = state.get("queue", [])
+        # Players with their join times and activity times (for inactivity check)
+        queue_state.entries = _restore_entries(
+            state.get("queue", []),
+            state.get("queue_join_times", {}),
+            state.get("last_activity_times", {})
+        )
         queue_state.test_mode = state.get("test_mode", False)
         queue_state.test_team = state.get("test_team")
 
-        # Restore join times
-        queue_join_times = state.get("queue_join_times", {})
-        for uid_str, time_str in queue_join_times.items():
-            queue_state.queue_join_times[int(uid_str)] = datetime.fromisoformat(time_str)
-
-        # Restore activity times (for inactivity check)
-        last_activity_times = state.get("last_activity_times", {})
-        for uid_str, time_str in last_activity_times.items():
-            queue_state.last_activity_times[int(uid_str)] = datetime.fromisoformat(time_str)
-
         # Restore pregame state for queue 1
         queue_state.pregame_vc_id = state.get("pregame_vc_id")
         queue_state.series_text_channel_id = state.get("series_text_channel_id")
@@ -192,22 +439,16 @@ async def restore_state(bot) -> bool:
         queue_state.testers = state.get("testers", [])
 
         has_pregame_1 = queue_state.pregame_vc_id or queue_state.locked_players
-        log_state(f"Restored queue 1: {len(queue_state.queue)} players, pregame: {has_pregame_1}")
+        log_state(f"Restored queue 1: {len(queue_state.entries)} players, pregame: {has_pregame_1}")
 
         # Restore queue 2 (queue_state_2)
-        queue_state_2.queue = state.get("queue_2", [])
+        queue_state_2.entries = _restore_entries(
+            state.get("queue_2", []),
+            state.get("queue_2_join_times", {}),
+            state.get("queue_2_last_activity_times", {})
+        )
         queue_state_2.test_mode = state.get("queue_2_test_mode", False)
 
-        # Restore join times for queue 2
-        queue_2_join_times = state.get("queue_2_join_times", {})
-        for uid_str, time_str in queue_2_join_times.items():
-            queue_state_2.queue_join_times[int(uid_str)] = datetime.fromisoformat(time_str)
-
-        # Restore activity times for queue 2
-        queue_2_activity_times = state.get("queue_2_last_activity_times", {})
-        for uid_str, time_str in queue_2_activity_times.items():
-            queue_state_2.last_activity_times[int(uid_str)] = datetime.fromisoformat(time_str)
-
         # Restore pregame state for queue 2
         queue_state_2.pregame_vc_id = state.get("queue_2_pregame_vc_id")
         queue_state_2.series_text_channel_id = state.get("queue_2_series_text_channel_id")
@@ -217,7 +458,24 @@ async def restore_state(bot) -> bool:
         queue_state_2.testers = state.get("queue_2_testers", [])
 
         has_pregame_2 = queue_state_2.pregame_vc_id or queue_state_2.locked_players
-        log_state(f"Restored queue 2: {len(queue_state_2.queue)} players, pregame: {has_pregame_2}")
+        log_state(f"Restored queue 2: {len(queue_state_2.entries)} players, pregame: {has_pregame_2}")
+
+        # Restore which match each locked-in player belongs to
+        restore_match_index(state.get("match_index", {}))
+
+        # Replay queue joins/leaves logged after the snapshot was taken
+        try:
+            deltas = _read_deltas(state.get("version", 0))
+            applied = sum(apply_delta(d, queue_state, queue_state_2) for d in deltas)
+            if applied:
+                log_state(f"Replayed {applied} queue changes from {DELTA_FILE} - "
+                          f"Queue 1: {len(queue_state.entries)}, Queue 2: {len(queue_state_2.entries)}")
+        except Exception as e:
+            log_state(f"Failed to replay state log: {e}")
+
+        # Wake the inactivity checkers for the restored queues
+        await notify_queue_changed(queue_state)
+        await notify_queue_changed(queue_state_2)
 
         # Always restore match counters (important for pregame state)
         if state.get("match_counter") is not None:
@@ -266,28 +524,10 @@ async def restore_state(bot) -> bool:
             queue_state.current_series = series
             
             log_state(f"Restored series: {series.series_number} - Game {series.current_game}")
-            
-            # Try to recover message references
-            guild = bot.guilds[0] if bot.guilds else None
+
+            # Recover message references and refresh general chat (below, with queue 2's)
             if guild:
-                # Recover series message
-                msg_channel_id = series_data.get("series_message_channel_id")
-                msg_id = series_data.get("series_message_id")
-                if msg_channel_id and msg_id:
-                    try:
-                        channel = guild.get_channel(msg_channel_id)
-                        if channel:
-                            series.series_message = await channel.fetch_message(msg_id)
-                            log_state("Recovered series message reference")
-                    except:
-                        log_state("Could not recover series message - will create new one")
-                
-                # Update general chat embed
-                try:
-                    await update_general_chat_embed(guild, series)
-                    log_state("Updated general chat embed")
-                except Exception as e:
-                    log_state(f"Failed to update general chat: {e}")
+                recoveries.append(_recover_series_messages(guild, series, series_data, "queue 1"))
 
         # Restore queue 2 series if active
         series_data_2 = state.get("queue_2_current_series")
@@ -327,14 +567,12 @@ async def restore_state(bot) -> bool:
             queue_state_2.current_series = series2
             log_state(f"Restored queue 2 series: {series2.series_number} - Game {series2.current_game}")
 
-            # Update general chat embed for queue 2 series
-            guild = bot.guilds[0] if bot.guilds else None
             if guild:
-                try:
-                    await update_general_chat_embed(guild, series2)
-                    log_state("Updated general chat embed for queue 2 series")
-                except Exception as e:
-                    log_state(f"Failed to update general chat for queue 2: {e}")
+                recoveries.append(_recover_series_messages(guild, series2, series_data_2, "queue 2"))
+
+        # All Discord round trips at once - startup waits for the slowest, not the sum
+        if recoveries:
+            await asyncio.gather(*recoveries, return_exceptions=True)
 
         log_state("State restoration complete")
         return True
@@ -1,7 +1,7 @@
 # statsdata.py - Game Data Management and Historical Series Processing
 # Handles reading game data, grouping into series, and generating embeds
 
-MODULE_VERSION = "1.1.0"
+MODULE_VERSION = "1.1.1"
 
 import discord
 import json
@@ -284,31 +284,31 @@ async def build_series_embed(
     )
 
     # Red team with rank emojis
-    red_team_text = ""
+    red_team_lines = []
     for player in red_players:
         rank = await get_player_rank_by_name(player, ranks_data)
         rank_emoji = get_rank_emoji(guild, rank)
-        red_team_text += f"{rank_emoji} {player}\n"
+        red_team_lines.append(f"{rank_emoji} {player}")
     embed.add_field(
         name=f"{red_emoji} Red Team",
-        value=red_team_text.strip() or "No players",
+        value="\n".join(red_team_lines).strip() or "No players",
         inline=True
     )
 
     # Blue team with rank emojis
-    blue_team_text = ""
+    blue_team_lines = []
     for player in blue_players:
         rank = await get_player_rank_by_name(player, ranks_data)
         rank_emoji = get_rank_emoji(guild, rank)
-        blue_team_text += f"{rank_emoji} {player}\n"
+        blue_team_lines.append(f"{rank_emoji} {player}")
     embed.add_field(
         name=f"{blue_emoji} Blue Team",
-        value=blue_team_text.strip() or "No players",
+        value="\n".join(blue_team_lines).strip() or "No players",
         inline=True
     )
 
     # Games breakdown
-    games_text = ""
+    games_lines = []
     for game in games:
         game_num = game.get("game_number", "?")
         game_winner = game.get("winner", "?")
@@ -317,11 +317,12 @@ async def build_series_embed(
         score = game.get("score", "")
 
         winner_emoji_game = red_emoji if game_winner == "RED" else blue_emoji
-        games_text += f"{winner_emoji_game} Game {game_num}: **{gametype}** on **{map_name}**"
+        game_line = f"{winner_emoji_game} Game {game_num}: **{gametype}** on **{map_name}**"
         if score:
-            games_text += f" ({score})"
-        games_text += "\n"
+            game_line += f" ({score})"
+        games_lines.append(game_line)
 
+    games_text = "\n".join(games_lines)
     if games_text:
         embed.add_field(
             name=f"Games Played ({len(games)})",
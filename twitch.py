@@ -3,7 +3,7 @@ twitch.py - Twitch Integration Module
 Manages player Twitch links, multi-stream URLs, and live stream notifications via EventSub WebSocket
 """
 
-MODULE_VERSION = "1.4.0"
+MODULE_VERSION = "1.4.1"
 
 import discord
 from discord import app_commands
@@ -344,9 +344,10 @@ def build_match_embed_with_twitch(
     # Completed games
     if series.games:
         from ingame import format_game_result
-        games_text = ""
-        for i, winner in enumerate(series.games, 1):
-            games_text += format_game_result(i, winner, series.game_stats)
+        games_text = "".join(
+            format_game_result(i, winner, series.game_stats)
+            for i, winner in enumerate(series.games, 1)
+        )
         
         embed.add_field(
             name="Completed Games",